@@ -0,0 +1,134 @@
+﻿import heapq
+import itertools
+
+from rooms import hasOpenExit, roomCost
+
+
+class Route(object):
+	"""A loop-free route, as the list of rooms along it and the list of directions taken between them"""
+
+	def __init__(self, rooms, directions, costs, deviation=0):
+		self.rooms = rooms
+		self.directions = directions
+		# costs[i] is the cost of the rooms entered on the way to rooms[i], so the last one is the cost of the whole route.
+		self.costs = costs
+		# The index of the room where this route leaves the route it was found from. Spur searches before this room would only find routes that are already known.
+		self.deviation = deviation
+
+	@property
+	def cost(self):
+		return self.costs[-1]
+
+	def key(self):
+		return (tuple(room.id for room in self.rooms), tuple(self.directions))
+
+
+def distancesTo(rooms, reverseExits, destination, blockedRooms=frozenset(), blockedExits=frozenset(), costOverrides=None):
+	"""
+	Returns a dict mapping every room that can reach destination to the cost of the cheapest route from it to destination, searching backward along the reverse exits.
+	blockedRooms is a set of the IDs of rooms that can't be entered, and blockedExits is a set of (room ID, direction) tuples of exits that can't be taken.
+	costOverrides maps the IDs of rooms whose cost has been changed to their new costs.
+	"""
+	distances = {destination: 0.0}
+	opened = [(0.0, destination.id)]
+	while opened:
+		cost, roomID = heapq.heappop(opened)
+		room = rooms[roomID]
+		if distances[room] < cost or roomID in blockedRooms:
+			continue
+		# Entering this room costs the same from whichever room the route came from.
+		neighborCost = cost + roomCost(room, costOverrides)
+		for fromID in reverseExits.get(roomID, ()):
+			fromRoom = rooms.get(fromID)
+			if fromRoom is None or blockedExits and not hasOpenExit(fromRoom, roomID, blockedExits):
+				continue
+			if fromRoom not in distances or distances[fromRoom] > neighborCost:
+				distances[fromRoom] = neighborCost
+				heapq.heappush(opened, (neighborCost, fromID))
+	return distances
+
+
+def spurSearch(rooms, origin, destination, distances, removedRooms, removedExits, costOverrides=None):
+	"""
+	Returns the cheapest route from origin to destination that avoids removedRooms and the (room, direction) pairs in removedExits, or None if there isn't one.
+	The search is an A* search, using the costs in distances as the estimate of the remaining cost. Removing rooms and exits can only make routes more expensive, so the estimate never overestimates and the route found is the cheapest.
+	"""
+	if origin not in distances:
+		return None
+	counter = itertools.count()
+	costs = {origin: 0.0}
+	parents = {origin: None}
+	closed = set()
+	opened = [(distances[origin], 0.0, next(counter), origin)]
+	while opened:
+		estimate, ignored, ignored, current = heapq.heappop(opened)
+		if current in closed:
+			continue
+		if current is destination:
+			break
+		closed.add(current)
+		for exitObj in current.exits:
+			neighbor = rooms.get(exitObj.to)
+			if neighbor is None or neighbor in removedRooms or neighbor not in distances or (current, exitObj.dir) in removedExits:
+				continue
+			neighborCost = costs[current] + roomCost(neighbor, costOverrides)
+			if neighbor not in costs or costs[neighbor] > neighborCost:
+				costs[neighbor] = neighborCost
+				parents[neighbor] = (current, exitObj.dir)
+				# Among rooms with the same estimate, the one furthest along is searched first, so that routes of equal cost don't all have to be searched.
+				heapq.heappush(opened, (neighborCost + distances[neighbor], -neighborCost, next(counter), neighbor))
+	else:
+		return None
+	routeRooms = [destination]
+	directions = []
+	while parents[routeRooms[-1]] is not None:
+		parent, direction = parents[routeRooms[-1]]
+		routeRooms.append(parent)
+		directions.append(direction)
+	routeRooms.reverse()
+	directions.reverse()
+	return Route(routeRooms, directions, [costs[room] for room in routeRooms])
+
+
+def findRoutes(rooms, reverseExits, origin, destination, count, blockedRooms=frozenset(), blockedExits=frozenset(), costOverrides=None):
+	"""
+	Returns a list of up to count loop-free routes from origin to destination, cheapest first, using Yen's algorithm.
+	Each new route is found by taking a route already found, and searching for the cheapest way to leave it at each room (the spur) without using the rooms before it, or an exit already taken from the same start of the route.
+	Routes don't enter the rooms with IDs in blockedRooms, or take the exits in blockedExits, a set of (room ID, direction) tuples. The costs of rooms with IDs in costOverrides are replaced with the costs it maps them to.
+	"""
+	distances = distancesTo(rooms, reverseExits, destination, blockedRooms, blockedExits, costOverrides)
+	# The spur searches work with room objects, so the blocked rooms and exits are converted to the same form as the rooms and exits they remove.
+	closedRooms = frozenset(rooms[roomID] for roomID in blockedRooms if roomID in rooms)
+	closedExits = frozenset((rooms[roomID], direction) for roomID, direction in blockedExits if roomID in rooms)
+	first = spurSearch(rooms, origin, destination, distances, closedRooms, closedExits, costOverrides)
+	if first is None:
+		return []
+	found = [first]
+	knownKeys = set([first.key()])
+	candidates = []
+	counter = itertools.count()
+	# Spur searches with the same start of the route and the same removed exits always find the same route, so their results are kept.
+	spurCache = {}
+	while len(found) < count:
+		previous = found[-1]
+		for index in xrange(previous.deviation, len(previous.rooms) - 1):
+			spurRoom = previous.rooms[index]
+			rootRooms = previous.rooms[:index + 1]
+			rootDirections = previous.directions[:index]
+			# Remove the next exit taken by every route found so far that starts the same way.
+			removedExits = frozenset((spurRoom, route.directions[index]) for route in found if route.rooms[:index + 1] == rootRooms and route.directions[:index] == rootDirections)
+			cacheKey = (tuple(room.id for room in rootRooms), tuple(rootDirections), removedExits)
+			if cacheKey not in spurCache:
+				spurCache[cacheKey] = spurSearch(rooms, spurRoom, destination, distances, closedRooms.union(rootRooms[:-1]), closedExits | removedExits, costOverrides)
+			spur = spurCache[cacheKey]
+			if spur is None:
+				continue
+			rootCost = previous.costs[index]
+			route = Route(rootRooms[:-1] + spur.rooms, rootDirections + spur.directions, previous.costs[:index] + [rootCost + cost for cost in spur.costs], index)
+			if route.key() not in knownKeys:
+				knownKeys.add(route.key())
+				heapq.heappush(candidates, (route.cost, next(counter), route))
+		if not candidates:
+			break
+		found.append(heapq.heappop(candidates)[2])
+	return found
@@ -0,0 +1,114 @@
+﻿import heapq
+import itertools
+
+from rooms import roomCost
+
+
+INFINITY = float("inf")
+
+
+class IncrementalRouter(object):
+	"""
+	Keeps the cost of the cheapest route from rooms to a fixed destination, and repairs those costs when exits or rooms are blocked or room costs change, rather than searching again from scratch.
+	This is Lifelong Planning A* searching backward from the destination along the reverse exits, as D* Lite does, without a heuristic. Without a heuristic the keys of the queued rooms don't depend on the origin, so the origin can move between searches without any adjustment.
+	"""
+
+	def __init__(self, rooms, getReverseExits, destination, blockedRooms, blockedExits, costOverrides):
+		self.rooms = rooms
+		self.getReverseExits = getReverseExits
+		self.destination = destination
+		# Sets of room IDs that can't be entered, and (room ID, direction) tuples of exits that can't be taken.
+		self.blockedRooms = blockedRooms
+		self.blockedExits = blockedExits
+		# Maps the IDs of rooms whose cost has been changed to their new costs.
+		self.costOverrides = costOverrides
+		# g is the cost from each room to the destination as of the last time the room was settled, and rhs is the cost worked out from the g values of its neighbors. A room needs settling again when they differ.
+		self.g = {}
+		self.rhs = {destination: 0.0}
+		# The queue holds (key, entry number, room) tuples. Entries are never removed from the heap, so queued maps each room to the number of its current entry, and other entries are skipped.
+		self.queue = []
+		self.queued = {}
+		self.counter = itertools.count()
+		self.push(destination, 0.0)
+
+	def push(self, room, key):
+		entry = next(self.counter)
+		self.queued[room] = entry
+		heapq.heappush(self.queue, (key, entry, room))
+
+	def topKey(self):
+		queue = self.queue
+		while queue and self.queued.get(queue[0][2]) != queue[0][1]:
+			heapq.heappop(queue)
+		return queue[0][0] if queue else INFINITY
+
+	def successors(self, room):
+		"""Yields tuples containing the direction and room object of every exit of room that can be taken"""
+		for exitObj in room.exits:
+			neighbor = self.rooms.get(exitObj.to)
+			if neighbor is None or exitObj.to in self.blockedRooms or self.blockedExits and (room.id, exitObj.dir) in self.blockedExits:
+				continue
+			yield exitObj.dir, neighbor
+
+	def predecessors(self, room):
+		for roomID in self.getReverseExits().get(room.id, ()):
+			predecessor = self.rooms.get(roomID)
+			if predecessor is not None:
+				yield predecessor
+
+	def updateRoom(self, room):
+		"""Works out the rhs value of room again, and queues it if it needs settling"""
+		g = self.g
+		if room is not self.destination:
+			costOverrides = self.costOverrides
+			self.rhs[room] = min([roomCost(neighbor, costOverrides) + g.get(neighbor, INFINITY) for direction, neighbor in self.successors(room)] or [INFINITY])
+		rhs = self.rhs.get(room, INFINITY)
+		if g.get(room, INFINITY) != rhs:
+			self.push(room, min(g.get(room, INFINITY), rhs))
+		else:
+			self.queued.pop(room, None)
+
+	def exitsChanged(self, room):
+		"""Repairs the costs after exits of room have been blocked or unblocked"""
+		self.updateRoom(room)
+
+	def entryChanged(self, room):
+		"""Repairs the costs after room has been blocked or unblocked, or its cost has changed, which affects every exit leading into it"""
+		for predecessor in self.predecessors(room):
+			self.updateRoom(predecessor)
+
+	def settle(self, origin):
+		"""Settles queued rooms until the cost from origin is known"""
+		g, rhs = self.g, self.rhs
+		while True:
+			topKey = self.topKey()
+			originG, originRHS = g.get(origin, INFINITY), rhs.get(origin, INFINITY)
+			if topKey >= min(originG, originRHS) and originG == originRHS or topKey == INFINITY:
+				break
+			ignored, ignored, room = heapq.heappop(self.queue)
+			del self.queued[room]
+			if g.get(room, INFINITY) > rhs.get(room, INFINITY):
+				g[room] = rhs[room]
+			else:
+				# The room became more expensive to route through, so its cost is worked out again from its neighbors.
+				g[room] = INFINITY
+				self.updateRoom(room)
+			for predecessor in self.predecessors(room):
+				self.updateRoom(predecessor)
+
+	def findDirections(self, origin):
+		"""Returns a list of the direction names along the cheapest route from origin to the destination, or None if there isn't a route"""
+		self.settle(origin)
+		g = self.g
+		costOverrides = self.costOverrides
+		if g.get(origin, INFINITY) == INFINITY:
+			return None
+		directions = []
+		room = origin
+		while room is not self.destination:
+			# Follow the exit into the neighbor with the cheapest route to the destination.
+			cost, ignored, direction, room = min((roomCost(neighbor, costOverrides) + g.get(neighbor, INFINITY), index, direction, neighbor) for index, (direction, neighbor) in enumerate(self.successors(room)))
+			if cost == INFINITY or len(directions) > len(self.rooms):
+				return None
+			directions.append(direction)
+		return directions
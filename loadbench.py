@@ -0,0 +1,52 @@
+﻿#!/usr/bin/env python2
+
+import argparse
+import multiprocessing
+import timeit
+
+import mmapper
+import pandora
+from rooms import roomFields
+
+
+def timeLoad(DBClass, fileName, processes=None):
+	"""Loads a database, and returns a tuple containing the rooms dict and the number of seconds taken"""
+	startTime = timeit.default_timer()
+	rooms = DBClass(fileName, processes=processes).rooms
+	return rooms, timeit.default_timer() - startTime
+
+
+def compareLoads(DBClass, fileName, processes, repeat=3):
+	"""Returns a list of lines comparing the best load times of the serial and parallel loaders, and checking that they load identical rooms"""
+	serialTimes = []
+	parallelTimes = []
+	for i in xrange(repeat):
+		serialRooms, seconds = timeLoad(DBClass, fileName)
+		serialTimes.append(seconds)
+		parallelRooms, seconds = timeLoad(DBClass, fileName, processes)
+		parallelTimes.append(seconds)
+	identical = sorted(serialRooms) == sorted(parallelRooms) and all(roomFields(room) == roomFields(parallelRooms[roomID]) for roomID, room in serialRooms.iteritems())
+	serialTime, parallelTime = min(serialTimes), min(parallelTimes)
+	return [
+		"Loaded %d rooms from %s (best of %d)." % (len(serialRooms), fileName, repeat),
+		"Serial: %.3f seconds." % serialTime,
+		"Parallel (%d processes): %.3f seconds, %.2fx the speed of the serial loader." % (processes, parallelTime, serialTime / parallelTime),
+		"Rooms are %s." % ("identical" if identical else "DIFFERENT")]
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Compares the time taken to load a database with the serial and parallel loaders.")
+	group = parser.add_mutually_exclusive_group(required=True)
+	group.add_argument("-m", "--mmapper", help="database is in MMapper 2 format", action="store_true")
+	group.add_argument("-p", "--pandora", help="database is in Pandora Mapper format", action="store_true")
+	parser.add_argument("-j", "--jobs", help="the number of worker processes used by the parallel loader (defaults to the number of CPUs)", type=int)
+	parser.add_argument("-r", "--repeat", help="the number of times to load the database with each loader", type=int, default=3)
+	parser.add_argument("databaseFile")
+	args = parser.parse_args()
+	DBClass = mmapper.Database if args.mmapper else pandora.Database
+	for line in compareLoads(DBClass, args.databaseFile, args.jobs or multiprocessing.cpu_count(), args.repeat):
+		print line
+
+
+if __name__ == "__main__":
+	main()
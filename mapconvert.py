@@ -0,0 +1,53 @@
+﻿#!/usr/bin/env python2
+
+import argparse
+import os
+import sys
+import timeit
+
+import mmapper
+import pandora
+
+
+def convertPandoraMap(inputFile, outputFile):
+	"""
+	Converts a Pandora map to a version 042 MMapper database, and returns the number of rooms converted.
+	The Pandora file is parsed twice, one room element at a time, so the whole map is never held in memory.
+	The first pass counts the rooms and finds the links into each one, which MMapper stores with the rooms they lead to. The second pass writes the rooms.
+	"""
+	directionNames = pandora.Database.directionNames
+	roomsCount = 0
+	inbound = {}
+	for roomsCount, room in enumerate(pandora.iterRooms(inputFile, directionNames), 1):
+		mmapper.inbound_connections([room], inbound)
+	# Write to a temporary file, so that a failed conversion doesn't leave a partial database behind.
+	tempFile = outputFile + ".tmp"
+	try:
+		with open(tempFile, "wb") as outfileobj:
+			mmapper.write_mmapper_data(outfileobj, pandora.iterRooms(inputFile, directionNames), roomsCount, inbound=inbound)
+		if os.path.exists(outputFile):
+			# Windows can't rename over an existing file.
+			os.remove(outputFile)
+		os.rename(tempFile, outputFile)
+	finally:
+		if os.path.exists(tempFile):
+			os.remove(tempFile)
+	return roomsCount
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Converts a Pandora Mapper map to an MMapper 2 database in the version 042 format. Pandora regions have no equivalent in MMapper, and exits into death traps are written without a destination.")
+	parser.add_argument("inputFile", help="the Pandora map")
+	parser.add_argument("outputFile", help="the MMapper database to write")
+	args = parser.parse_args()
+	startTime = timeit.default_timer()
+	try:
+		roomsCount = convertPandoraMap(args.inputFile, args.outputFile)
+	except (IOError, ValueError, mmapper.MMapperException) as e:
+		print >> sys.stderr, e
+		sys.exit(1)
+	print "Converted %d rooms in %.3f seconds." % (roomsCount, timeit.default_timer() - startTime)
+
+
+if __name__ == "__main__":
+	main()
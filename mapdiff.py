@@ -0,0 +1,247 @@
+﻿#!/usr/bin/env python2
+
+# Compares 2 map databases room by room, without loading either of them into memory.
+# Each file is read twice: once to compute a digest of every room, and once more to collect the fields of the rooms whose digests differ.
+# When both files are MMapper databases of the same version, the digests are taken over the raw room records, so only the rooms that differ are decoded.
+
+import argparse
+import cStringIO
+import hashlib
+import itertools
+import json
+import struct
+
+import mmapper
+import pandora
+
+
+FIELDS = ("name", "desc", "terrain", "flags", "exits", "coordinates")
+EXIT_NAMES = ("north", "south", "east", "west", "up", "down", "unknown")
+UINT32 = struct.Struct(">I")
+# The room records of an MMapper database start after the rooms count, the marks count, and the selected position.
+MMAPPER_ROOMS_OFFSET = 20
+
+
+class FlagDecoder(object):
+	"""Decodes bit flags into sorted tuples of flag names, remembering the result for every value seen"""
+
+	def __init__(self, namedBitFlags):
+		self.namedBitFlags = namedBitFlags
+		self.cache = {}
+
+	def __call__(self, bits):
+		try:
+			return self.cache[bits]
+		except KeyError:
+			result = self.cache[bits] = tuple(sorted(self.namedBitFlags.bits_to_flag_set(bits)))
+			return result
+
+
+mobFlags = FlagDecoder(mmapper.mobflags)
+loadFlags = FlagDecoder(mmapper.loadflags)
+doorFlags = FlagDecoder(mmapper.doorflags)
+
+
+def normalizeDesc(desc):
+	# In Pandora databases, The description text uses '|' (bar) as an end of line character.
+	lines = (desc or u"").replace(u"|", u"\n").splitlines()
+	return u"\n".join(line.strip() for line in lines if line.strip())
+
+
+def sortExits(exits):
+	return tuple(sorted(exits, key=lambda item: EXIT_NAMES.index(item[0])))
+
+
+def mmapperVersion(fileName):
+	"""Returns the version of an MMapper database, or None if the file isn't in MMapper format"""
+	with open(fileName, "rb") as infileobj:
+		header = infileobj.read(4)
+		if len(header) != 4 or UINT32.unpack(header)[0] != mmapper.MMAPPER_MAGIC:
+			return None
+		version = mmapper.read_int32(infileobj)
+	if version not in mmapper.MMAPPER_VERSIONS:
+		raise mmapper.UnsupportedVersionException(version)
+	return version
+
+
+def readMMapperData(fileName):
+	"""Returns the version and the decompressed data of an MMapper database"""
+	with open(fileName, "rb") as infileobj:
+		if mmapper.read_uint32(infileobj) != mmapper.MMAPPER_MAGIC:
+			raise mmapper.BadMagicNumberException()
+		version = mmapper.read_int32(infileobj)
+		if version not in mmapper.MMAPPER_VERSIONS:
+			raise mmapper.UnsupportedVersionException(version)
+		return version, mmapper.decompress_mmapper_data(version, infileobj).getvalue()
+
+
+def mmapperFields(room):
+	"""Returns the normalized fields of a room read by mmapper.read_room"""
+	exits = []
+	exitFlagsList = []
+	for exitObj in room.exits:
+		# mmapper.read_exit marks exits without an outbound connection with a lower case name.
+		to = "UNDEFINED" if exitObj.to == "undefined" else exitObj.to
+		exits.append((exitObj.dir, to, unicode(exitObj.door)))
+		if exitObj.doorFlagBits:
+			exitFlagsList.append((exitObj.dir, doorFlags(exitObj.doorFlagBits)))
+	return {
+		"name": unicode(room.name),
+		"desc": normalizeDesc(room.desc),
+		"terrain": room.terrain.upper(),
+		# Door flags are kept with the room flags, rather than the exits, so that all flags can be ignored when comparing with Pandora databases.
+		"flags": (mobFlags(room.mobFlagBits), loadFlags(room.loadFlagBits), tuple(exitFlagsList)),
+		"exits": sortExits(exits),
+		"coordinates": (room.x, room.y, room.z)}
+
+
+def iterMMapperRooms(fileName):
+	"""Yields a tuple containing the ID and normalized fields of every room in an MMapper database"""
+	version, data = readMMapperData(fileName)
+	stream = cStringIO.StringIO(data)
+	roomsCount = mmapper.read_uint32(stream)
+	stream.seek(MMAPPER_ROOMS_OFFSET)
+	for i in xrange(roomsCount):
+		room = mmapper.read_room(version, stream)
+		yield room.id, mmapperFields(room)
+
+
+def digestMMapperRecords(fileName):
+	"""
+	Returns a dict mapping the ID of every room in an MMapper database to a digest of its raw record, and a dict mapping the IDs to the offsets of the records in the decompressed data.
+	The records are found with mmapper.index_room_records, which only reads the lengths of the fields, so no room is decoded.
+	"""
+	version, data = readMMapperData(fileName)
+	roomsCount = UINT32.unpack_from(data, 0)[0]
+	offsets = mmapper.index_room_records(version, data, MMAPPER_ROOMS_OFFSET, roomsCount)
+	unpack = UINT32.unpack_from
+	sha1 = hashlib.sha1
+	digests = {}
+	starts = {}
+	for start, end in itertools.izip(offsets, itertools.islice(offsets, 1, None)):
+		# The room ID follows the name, description, and dynamic description.
+		pos = start
+		for field in xrange(3):
+			length = unpack(data, pos)[0]
+			pos += 4 if length == mmapper.UINT32_MAX else 4 + length
+		roomID = str(unpack(data, pos)[0])
+		digests[roomID] = sha1(data[start:end]).digest()
+		starts[roomID] = start
+	return digests, starts
+
+
+def collectMMapperRecords(fileName, starts, roomIDs):
+	"""Returns a dict mapping room IDs to the fields of the rooms, decoding only the records of the given room IDs, whose offsets are in starts"""
+	version, data = readMMapperData(fileName)
+	stream = cStringIO.StringIO(data)
+	rooms = {}
+	for roomID in roomIDs:
+		stream.seek(starts[roomID])
+		rooms[roomID] = mmapperFields(mmapper.read_room(version, stream))
+	return rooms
+
+
+def pandoraCoordinates(element):
+	"""Returns a tuple of the x, y, and z coordinates of a Pandora room element, or None if any of them are missing or invalid"""
+	try:
+		return tuple(int(element.get(axis)) for axis in ("x", "y", "z"))
+	except (TypeError, ValueError):
+		return None
+
+
+def iterPandoraRooms(fileName):
+	"""Yields a tuple containing the ID and normalized fields of every room in a Pandora database"""
+	for element in pandora.iterElements(fileName, "room"):
+		exits = []
+		for x in element.findall("./exits/exit"):
+			exits.append((pandora.Database.directionNames[x.get("dir")], x.get("to"), x.get("door") or u""))
+		yield element.get("id"), {
+			"name": element.findtext("roomname") or u"",
+			"desc": normalizeDesc(element.findtext("desc")),
+			"terrain": element.get("terrain", "UNDEFINED").upper(),
+			"flags": ((), (), ()),
+			"exits": sortExits(exits),
+			# Rooms without valid coordinates are compared with None as their coordinates, rather than stopping the comparison.
+			"coordinates": pandoraCoordinates(element)}
+
+
+def iterRooms(fileName):
+	"""Yields the rooms of a database in either format, determining the format from the first bytes of the file"""
+	if mmapperVersion(fileName) is not None:
+		return iterMMapperRooms(fileName)
+	return iterPandoraRooms(fileName)
+
+
+def digestRooms(fileName, fields):
+	"""Returns a dict mapping the ID of every room in a database to a digest of the given fields"""
+	digests = {}
+	for roomID, room in iterRooms(fileName):
+		# JSON is used as the canonical form, because it encodes str and unicode objects with the same value identically.
+		digests[roomID] = hashlib.sha1(json.dumps([room[field] for field in fields])).digest()
+	return digests
+
+
+def collectRooms(fileName, roomIDs):
+	"""Returns a dict mapping room IDs to the fields of the rooms, for only the given room IDs"""
+	return dict((roomID, room) for roomID, room in iterRooms(fileName) if roomID in roomIDs)
+
+
+def diffMaps(oldFileName, newFileName, fields=FIELDS):
+	"""Returns a dict listing the IDs of added and removed rooms, and the old and new values of the changed fields of modified rooms"""
+	oldVersion = mmapperVersion(oldFileName)
+	if oldVersion is not None and oldVersion == mmapperVersion(newFileName):
+		# The records of both files have the same layout, so rooms with identical records are identical, and the others are only decoded to find which fields changed.
+		# Records that differ only in fields that aren't compared, such as the note, or the inbound connections, turn out to have no changed fields, and aren't reported.
+		oldDigests, oldStarts = digestMMapperRecords(oldFileName)
+		newDigests, newStarts = digestMMapperRecords(newFileName)
+		collectOld = lambda roomIDs: collectMMapperRecords(oldFileName, oldStarts, roomIDs)
+		collectNew = lambda roomIDs: collectMMapperRecords(newFileName, newStarts, roomIDs)
+	else:
+		oldDigests = digestRooms(oldFileName, fields)
+		newDigests = digestRooms(newFileName, fields)
+		collectOld = lambda roomIDs: collectRooms(oldFileName, roomIDs)
+		collectNew = lambda roomIDs: collectRooms(newFileName, roomIDs)
+	added = sorted((roomID for roomID in newDigests if roomID not in oldDigests), key=lambda roomID: (len(roomID), roomID))
+	removed = sorted((roomID for roomID in oldDigests if roomID not in newDigests), key=lambda roomID: (len(roomID), roomID))
+	modifiedIDs = set(roomID for roomID, digest in newDigests.iteritems() if roomID in oldDigests and oldDigests[roomID] != digest)
+	modified = {}
+	if modifiedIDs:
+		oldRooms = collectOld(modifiedIDs)
+		newRooms = collectNew(modifiedIDs)
+		for roomID in modifiedIDs:
+			changes = dict((field, {"old": oldRooms[roomID][field], "new": newRooms[roomID][field]}) for field in fields if oldRooms[roomID][field] != newRooms[roomID][field])
+			if changes:
+				modified[roomID] = changes
+	return {"added": added, "removed": removed, "modified": modified}
+
+
+def formatDiff(diff):
+	lines = []
+	lines.append("%d rooms added, %d removed, %d modified." % (len(diff["added"]), len(diff["removed"]), len(diff["modified"])))
+	if diff["added"]:
+		lines.append("Added: %s" % ", ".join(diff["added"]))
+	if diff["removed"]:
+		lines.append("Removed: %s" % ", ".join(diff["removed"]))
+	for roomID in sorted(diff["modified"], key=lambda roomID: (len(roomID), roomID)):
+		lines.append("Modified room %s:" % roomID)
+		for field, values in sorted(diff["modified"][roomID].iteritems()):
+			lines.append("  %s: %r -> %r" % (field, values["old"], values["new"]))
+	return lines
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Compare 2 map databases, in MMapper or Pandora format, and report the rooms that were added, removed, or modified.")
+	parser.add_argument("-i", "--ignore", help="a field to leave out of the comparison. May be given more than once.", action="append", choices=FIELDS, default=[])
+	parser.add_argument("-j", "--json", help="write the report in JSON format", action="store_true")
+	parser.add_argument("old", help="the old database file")
+	parser.add_argument("new", help="the new database file")
+	args = parser.parse_args()
+	diff = diffMaps(args.old, args.new, tuple(field for field in FIELDS if field not in args.ignore))
+	if args.json:
+		print json.dumps(diff, sort_keys=True, indent=2, separators=(",", ": "))
+	else:
+		print u"\n".join(formatDiff(diff)).encode("utf-8")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,153 @@
+﻿#!/usr/bin/env python2
+
+import argparse
+import collections
+import json
+import multiprocessing
+import sys
+
+import mmapper
+import pandora
+
+
+OPPOSITE_DIRECTIONS = {"north": "south", "south": "north", "east": "west", "west": "east", "up": "down", "down": "up"}
+EXIT_CHECKS = ("missing_rooms", "one_way_exits", "unnamed_doors", "death_exits")
+CHECKS = EXIT_CHECKS + ("duplicate_coordinates", "missing_coordinates", "unreachable_rooms")
+# Pandora databases don't store exit flags, so a door without a name can't be told apart from an exit without a door.
+PANDORA_SKIPPED_CHECKS = ("unnamed_doors",)
+# The number of shards given to each worker process, so that a slow shard doesn't leave the other workers idle.
+SHARDS_PER_PROCESS = 4
+
+# The rooms of the map being checked. Worker processes inherit this from the parent process when they are forked, so the map is only loaded once.
+_rooms = None
+
+
+def roomKey(roomID):
+	return (len(roomID), roomID)
+
+
+def _initWorker(DBClass, fileName):
+	global _rooms
+	if _rooms is None:
+		# The worker wasn't forked from the parent process, so it has to load the map itself.
+		_rooms = DBClass(fileName).rooms
+
+
+def _checkShard(roomIDs):
+	"""Runs the exit checks on the rooms with the given IDs, and returns a dict mapping the name of each check to a list of problems"""
+	rooms = _rooms
+	result = dict((check, []) for check in EXIT_CHECKS)
+	for roomID in roomIDs:
+		for exitObj in rooms[roomID].exits:
+			problem = {"room": roomID, "dir": exitObj.dir, "to": exitObj.to}
+			if exitObj.exitFlagBits & mmapper.EXIT_FLAG_DOOR and exitObj.door in ("", "exit"):
+				# The MMapper loader names doors without a name 'exit'. Pandora exits have no flags, so this never matches them.
+				result["unnamed_doors"].append(problem)
+			target = rooms.get(exitObj.to)
+			if exitObj.to == "DEATH" or target is not None and target.terrain.upper() == "DEATH":
+				result["death_exits"].append(problem)
+			elif exitObj.to.isdigit() and target is None:
+				result["missing_rooms"].append(problem)
+			elif target is not None and exitObj.dir in OPPOSITE_DIRECTIONS:
+				reverse = OPPOSITE_DIRECTIONS[exitObj.dir]
+				if not any(item.dir == reverse and item.to == roomID for item in target.exits):
+					result["one_way_exits"].append(problem)
+	return result
+
+
+def roomCoordinates(room):
+	"""Returns a tuple of the x, y, and z coordinates of a room as integers, or None if any of them are missing or invalid"""
+	try:
+		return (int(room.x), int(room.y), int(room.z))
+	except (AttributeError, TypeError, ValueError):
+		return None
+
+
+def duplicateCoordinates(rooms):
+	"""Returns a list of the groups of rooms that share the same coordinates. Rooms without valid coordinates are reported by missingCoordinates instead"""
+	byCoordinates = collections.defaultdict(list)
+	for roomID, room in rooms.iteritems():
+		coordinates = roomCoordinates(room)
+		if coordinates is not None:
+			byCoordinates[coordinates].append(roomID)
+	duplicates = [{"coordinates": list(coordinates), "rooms": sorted(roomIDs, key=roomKey)} for coordinates, roomIDs in byCoordinates.iteritems() if len(roomIDs) > 1]
+	duplicates.sort(key=lambda item: roomKey(item["rooms"][0]))
+	return duplicates
+
+
+def missingCoordinates(rooms):
+	"""Returns a sorted list of the IDs of the rooms with missing or invalid coordinates"""
+	return sorted((roomID for roomID, room in rooms.iteritems() if roomCoordinates(room) is None), key=roomKey)
+
+
+def unreachableRooms(rooms, origin):
+	"""Returns a sorted list of the IDs of the rooms that can't be reached from origin by following exits, or an empty list if origin is None because the map has no rooms"""
+	if origin is None:
+		return []
+	reached = set([origin])
+	pending = [origin]
+	while pending:
+		for exitObj in rooms[pending.pop()].exits:
+			if exitObj.to in rooms and exitObj.to not in reached:
+				reached.add(exitObj.to)
+				pending.append(exitObj.to)
+	# Death traps are reported by the exits leading into them, so they aren't expected to be reachable.
+	return sorted((roomID for roomID, room in rooms.iteritems() if roomID not in reached and room.terrain.upper() != "DEATH"), key=roomKey)
+
+
+def lintMap(DBClass, fileName, origin=None, processes=None):
+	"""Loads a map, and returns a dict reporting the problems found by every check"""
+	global _rooms
+	_rooms = rooms = DBClass(fileName).rooms
+	roomIDs = sorted(rooms, key=roomKey)
+	if origin is None:
+		# An empty map has no origin, and nothing to be unreachable from it.
+		origin = roomIDs[0] if roomIDs else None
+	elif origin not in rooms:
+		raise ValueError("Invalid origin room ID: %s" % origin)
+	processes = processes or multiprocessing.cpu_count()
+	shardSize = len(roomIDs) // (processes * SHARDS_PER_PROCESS) + 1
+	shards = [roomIDs[i:i + shardSize] for i in xrange(0, len(roomIDs), shardSize)]
+	pool = multiprocessing.Pool(processes, initializer=_initWorker, initargs=(DBClass, fileName))
+	try:
+		handle = pool.map_async(_checkShard, shards)
+		# The checks that need the whole map run in this process while the workers check the exits.
+		issues = {"duplicate_coordinates": duplicateCoordinates(rooms), "missing_coordinates": missingCoordinates(rooms), "unreachable_rooms": unreachableRooms(rooms, origin)}
+		shardResults = handle.get()
+	finally:
+		pool.close()
+		pool.join()
+	# The shards were made from the sorted room IDs, and map_async returns their results in order, so the merged lists are sorted as well.
+	for check in EXIT_CHECKS:
+		issues[check] = [problem for result in shardResults for problem in result[check]]
+	return {
+		"database": fileName,
+		"rooms": len(rooms),
+		"exits": sum(len(room.exits) for room in rooms.itervalues()),
+		"origin": origin,
+		"counts": dict((check, len(issues[check])) for check in CHECKS),
+		"issues": issues,
+		"skipped": list(PANDORA_SKIPPED_CHECKS) if DBClass is pandora.Database else []}
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Checks a map database for exits to missing rooms, one-way exits, doors without names (MMapper only), rooms sharing coordinates or without coordinates, rooms unreachable from an origin, and exits into death traps. The report is written to standard output in JSON format.")
+	group = parser.add_mutually_exclusive_group(required=True)
+	group.add_argument("-m", "--mmapper", help="database is in MMapper 2 format", action="store_true")
+	group.add_argument("-p", "--pandora", help="database is in Pandora Mapper format", action="store_true")
+	parser.add_argument("-j", "--jobs", help="the number of worker processes (defaults to the number of CPUs)", type=int)
+	parser.add_argument("-o", "--origin", help="the room ID that every room should be reachable from (defaults to the lowest room ID)")
+	parser.add_argument("databaseFile")
+	args = parser.parse_args()
+	DBClass = mmapper.Database if args.mmapper else pandora.Database
+	try:
+		report = lintMap(DBClass, args.databaseFile, args.origin, args.jobs)
+	except ValueError as e:
+		print >> sys.stderr, e
+		sys.exit(1)
+	print json.dumps(report, sort_keys=True, indent=2, separators=(",", ": "))
+	print >> sys.stderr, ", ".join("%s: %s" % (check, "skipped" if check in report["skipped"] else report["counts"][check]) for check in CHECKS)
+
+
+if __name__ == "__main__":
+	main()
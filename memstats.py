@@ -0,0 +1,133 @@
+﻿import sys
+
+try:
+	import tracemalloc
+except ImportError:
+	tracemalloc = None
+
+
+TEXT_FIELDS = ("name", "desc", "dynamicDesc", "note")
+ROOM_FLAG_FIELDS = ("mobFlagBits", "loadFlagBits")
+EXIT_FLAG_FIELDS = ("exitFlagBits", "doorFlagBits")
+
+
+class SizeCounter(object):
+	"""Sums the sizes of objects, counting any object that is shared between rooms only once"""
+
+	def __init__(self):
+		self.seen = set()
+
+	def size(self, obj):
+		if id(obj) in self.seen:
+			return 0
+		self.seen.add(id(obj))
+		return sys.getsizeof(obj)
+
+
+def worldMemory(rooms):
+	"""Returns a dict with the memory used by the rooms dict, broken down by component"""
+	counter = SizeCounter()
+	result = {
+		"rooms": len(rooms),
+		"exits": 0,
+		"room_objects": 0,
+		"exit_objects": 0,
+		"other_attributes": 0,
+		"dict_overhead": counter.size(rooms) + sum(counter.size(key) for key in rooms),
+		"text": dict((field, 0) for field in TEXT_FIELDS),
+		"flags": dict((field, 0) for field in ROOM_FLAG_FIELDS + EXIT_FLAG_FIELDS),
+		"duplicates": dict((field, {"total": 0, "distinct": 0, "copies": 0, "wasted": 0}) for field in TEXT_FIELDS)}
+	# For each text field, map the value of the string to the set of object IDs holding that value.
+	textValues = dict((field, {}) for field in TEXT_FIELDS)
+	for room in rooms.itervalues():
+		attributes = vars(room)
+		result["room_objects"] += counter.size(room) + counter.size(attributes)
+		for key, value in attributes.iteritems():
+			if key in TEXT_FIELDS:
+				result["text"][key] += counter.size(value)
+				if value:
+					textValues[key].setdefault(value, set()).add(id(value))
+			elif key in ROOM_FLAG_FIELDS:
+				result["flags"][key] += counter.size(value)
+			elif key == "exits":
+				result["exit_objects"] += counter.size(value)
+				for exitObj in value:
+					result["exits"] += 1
+					exitAttributes = vars(exitObj)
+					result["exit_objects"] += counter.size(exitObj) + counter.size(exitAttributes)
+					for exitKey, exitValue in exitAttributes.iteritems():
+						if exitKey in EXIT_FLAG_FIELDS:
+							result["flags"][exitKey] += counter.size(exitValue)
+						else:
+							result["other_attributes"] += counter.size(exitValue)
+			else:
+				result["other_attributes"] += counter.size(value)
+	for field, values in textValues.iteritems():
+		duplicates = result["duplicates"][field]
+		for value, objectIDs in values.iteritems():
+			duplicates["total"] += len(objectIDs)
+			duplicates["distinct"] += 1
+			# Every string object beyond the first one holding the same value is a wasted copy.
+			duplicates["copies"] += len(objectIDs) - 1
+			duplicates["wasted"] += (len(objectIDs) - 1) * sys.getsizeof(value)
+	result["total"] = result["dict_overhead"] + result["room_objects"] + result["exit_objects"] + result["other_attributes"] + sum(result["text"].values()) + sum(result["flags"].values())
+	return result
+
+
+def formatSize(size):
+	for unit in ("bytes", "KB", "MB"):
+		if size < 1024:
+			return "%d %s" % (size, unit) if unit == "bytes" else "%.1f %s" % (size, unit)
+		size /= 1024.0
+	return "%.1f GB" % size
+
+
+def formatWorldMemory(stats):
+	"""Returns a list of lines describing the output of worldMemory"""
+	roomsCount = stats["rooms"] or 1
+	lines = []
+	lines.append("Memory used by %d rooms and %d exits: %s (%s per room)." % (stats["rooms"], stats["exits"], formatSize(stats["total"]), formatSize(stats["total"] // roomsCount)))
+	lines.append("Room objects: %s" % formatSize(stats["room_objects"]))
+	lines.append("Exit objects: %s" % formatSize(stats["exit_objects"]))
+	for field in TEXT_FIELDS:
+		lines.append("Text (%s): %s" % (field, formatSize(stats["text"][field])))
+	for field in ROOM_FLAG_FIELDS + EXIT_FLAG_FIELDS:
+		lines.append("Flags (%s): %s" % (field, formatSize(stats["flags"][field])))
+	lines.append("Other attributes: %s" % formatSize(stats["other_attributes"]))
+	lines.append("Rooms dict overhead: %s" % formatSize(stats["dict_overhead"]))
+	lines.append("Duplicate strings:")
+	for field in TEXT_FIELDS:
+		duplicates = stats["duplicates"][field]
+		lines.append("%s: %d strings, %d distinct, %d duplicate copies wasting %s" % (field, duplicates["total"], duplicates["distinct"], duplicates["copies"], formatSize(duplicates["wasted"])))
+	return lines
+
+
+def formatTextPool(pool):
+	"""Returns a list of lines describing the strings shared by the text pool of a database"""
+	distinct = getattr(pool, "distinct", len(pool.strings))
+	return ["Text pool: %d strings loaded, %d distinct (%.1f:1 dedupe ratio), %s saved." % (pool.lookups, distinct, float(pool.lookups) / (distinct or 1), formatSize(pool.savedBytes))]
+
+
+def traceLoad(DBClass, fileName, snapshotFile=None, limit=10):
+	"""
+	Loads the database with tracemalloc enabled.
+	Returns a tuple containing the database object and a list of lines describing the top allocations of the load path.
+	If snapshotFile is given, the tracemalloc snapshot will be saved to it for later comparison. ValueError is raised if it's given and tracemalloc is unavailable.
+	"""
+	if tracemalloc is None:
+		if snapshotFile:
+			raise ValueError("A snapshot can't be saved: the tracemalloc module could not be imported.")
+		return DBClass(fileName), ["Memory tracing is unavailable: the tracemalloc module could not be imported."]
+	tracemalloc.start()
+	try:
+		database = DBClass(fileName)
+		snapshot = tracemalloc.take_snapshot()
+		current, peak = tracemalloc.get_traced_memory()
+	finally:
+		tracemalloc.stop()
+	if snapshotFile:
+		snapshot.dump(snapshotFile)
+	lines = ["Database load: %s allocated, %s peak." % (formatSize(current), formatSize(peak))]
+	for stat in snapshot.statistics("lineno")[:limit]:
+		lines.append(str(stat))
+	return database, lines
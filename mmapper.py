@@ -1,426 +1,743 @@
-﻿# This module was originally written by Chris Brannon.
-# https://github.com/CMB
-# Chris has graciously placed the source code of this module in the public domain.
-
-import cStringIO
-import struct
-import zlib
-
-from jd2gcal import jd2gcal
-from rooms import Room, Exit
-
-
-UINT8_MAX = 0xff
-UINT32_MAX = 0xffffffff
-MMAPPER_MAGIC = 0xffb2af01
-MMAPPER_VERSIONS = (031, 040, 041, 042)
-
-
-class MMapperException(Exception):
-	pass
-
-
-class IncompleteDataFileException(MMapperException):
-	pass
-
-
-class BadMagicNumberException(MMapperException):
-	pass
-
-
-class UnsupportedVersionException(MMapperException):
-	def __init__(self, number):
-		MMapperException.__init__(self, "Do not support version %d of mmapper data" % number)
-
-
-class NamedBitFlags(object):
-	def __init__(self, names_and_bits):
-		self.map_by_name = {}
-		self.map_by_number = {}
-		for name, bit in names_and_bits:
-			self.map_by_number[1 << (bit - 1)] = name
-			self.map_by_name[name] = 1 << (bit - 1)
-
-	def bits_to_flag_set(self, bits):
-		flag_set = set()
-		for num in self.map_by_number.keys():
-			if bits & num:
-				flag_set.add(self.map_by_number[num])
-		return flag_set
-
-
-# Need to clean up these classes later.
-# There's no encapsulation here at all.
-class MMapperData(object):
-	# Fields: rooms, selected (a position)
-	def __init__(self):
-		self.rooms = {}
-		self.marks = []
-
-
-mobflags = NamedBitFlags([
-	("rent", 1),
-	("shop", 2),
-	("weaponshop", 3),
-	("armourshop", 4),
-	("foodshop", 5),
-	("petshop", 6),
-	("guild", 7),
-	("scoutguild", 8),
-	("mageguild", 9),
-	("clericguild", 10),
-	("warriorguild", 11),
-	("rangerguild", 12),
-	("smob", 13), # Aggressive mob.
-	("quest", 14),
-	("any", 15), # Peaseful mob.
-	("reserved2", 16)
-])
-
-loadflags = NamedBitFlags([
-	("treasure", 1),
-	("armour", 2),
-	("weapon", 3),
-	("water", 4),
-	("food", 5),
-	("herb", 6),
-	("key", 7),
-	("mule", 8),
-	("horse", 9),
-	("packhorse", 10),
-	("trainedhorse", 11),
-	("rohirrim", 12),
-	("warg", 13),
-	("boat", 14),
-	("attention", 15),
-	("tower", 16), # Player can 'watch' surrounding rooms from this one.
-	("clock", 17),
-	("mail", 18),
-	("stable", 19)
-])
-
-exitflags = NamedBitFlags([
-	("exit", 1),
-	("door", 2),
-	("road", 3),
-	("climb", 4),
-	("random", 5),
-	("special", 6),
-	("no_match", 7),
-	("flow", 8),
-	("no_flee", 9),
-	("damage", 10),
-	("fall", 11),
-	("guarded", 12)
-])
-
-doorflags = NamedBitFlags([
-	("hidden", 1),
-	("needkey", 2),
-	("noblock", 3),
-	("nobreak", 4),
-	("nopick", 5),
-	("delayed", 6),
-	("callable", 7),
-	("knockable", 8),
-	("magic", 9),
-	("action", 10)
-])
-
-align_type = {
-	0: "undefined",
-	1: "good",
-	2: "neutral",
-	3: "evil"}
-
-info_mark_type = {
-	0: "text",
-	1: "line",
-	2: "arrow"
-}
-
-info_mark_class = {
-	0: "generic",
-	1: "herb",
-	2: "river",
-	3: "place",
-	4: "mob",
-	5: "comment",
-	6: "road",
-	7: "object",
-	8: "action",
-	9: "locality"
-}
-
-light_type = {
-	0: "undefined",
-	1: "dark",
-	2: "lit"}
-
-portable_type = {
-	0: "undefined",
-	1: "portable",
-	2: "notportable"}
-
-ridable_type = {
-	0: "undefined",
-	1: "ridable",
-	2: "notridable"}
-
-sundeath_type = {
-	0: "undefined",
-	1: "sundeath",
-	2: "nosundeath"}
-
-terrain_type = {
-	0: "undefined",
-	1: "indoors",
-	2: "city",
-	3: "field",
-	4: "forest",
-	5: "hills",
-	6: "mountains",
-	7: "shallowwater",
-	8: "water",
-	9: "rapids",
-	10: "underwater",
-	11: "road",
-	12: "brush",
-	13: "tunnel",
-	14: "cavern",
-	15: "death",
-	16: "random"
-}
-
-
-def read_uint32(infileobj):
-	data = infileobj.read(4)
-	if len(data) != 4:
-		raise IncompleteDataFileException()
-	return struct.unpack(">I", data)[0]
-
-
-def read_int32(infileobj):
-	data = infileobj.read(4)
-	if len(data) != 4:
-		raise IncompleteDataFileException()
-	return struct.unpack(">i", data)[0]
-
-
-def read_uint16(infileobj):
-	data = infileobj.read(2)
-	if len(data) != 2:
-		raise IncompleteDataFileException()
-	return struct.unpack(">H", data)[0]
-
-
-def read_int16(infileobj):
-	data = infileobj.read(2)
-	if len(data) != 2:
-		raise IncompleteDataFileException()
-	return struct.unpack(">h", data)[0]
-
-
-def read_uint8(infileobj):
-	data = infileobj.read(1)
-	if len(data) != 1:
-		raise IncompleteDataFileException()
-	return struct.unpack("B", data)[0]
-
-
-def read_int8(infileobj):
-	data = infileobj.read(1)
-	if len(data) != 1:
-		raise IncompleteDataFileException()
-	return struct.unpack("b", data)[0]
-
-
-def read_qstring(infileobj):
-	length = read_uint32(infileobj)
-	if length == UINT32_MAX:
-		return ""
-	ucs_data = infileobj.read(length)
-	if len(ucs_data) != length:
-		raise IncompleteDataFileException()
-	return ucs_data.decode("UTF_16_BE")
-
-
-def read_exit(version, infileobj):
-	new_exit = Exit()
-	if version >= 041:
-		new_exit.exitFlags = exitflags.bits_to_flag_set(read_uint16(infileobj))
-	else:
-		new_exit.exitFlags = exitflags.bits_to_flag_set(read_uint8(infileobj))
-	if version >= 040:
-		new_exit.doorFlags = doorflags.bits_to_flag_set(read_uint16(infileobj))
-	else:
-		new_exit.doorFlags = doorflags.bits_to_flag_set(read_uint8(infileobj))
-	new_exit.door = read_qstring(infileobj)
-	if "door" in new_exit.exitFlags:
-		new_exit.exitFlags.add("exit")
-		if not new_exit.door:
-			new_exit.door = "exit"
-	# Inbound connections are unneeded.
-	connection = read_uint32(infileobj)
-	while connection != UINT32_MAX:
-		connection = read_uint32(infileobj)
-	outConnections = []
-	connection = read_uint32(infileobj)
-	while connection != UINT32_MAX:
-		outConnections.append(str(connection))
-		connection = read_uint32(infileobj)
-	if not outConnections:
-		new_exit.to = "undefined"
-	else:
-		# We want the last outbound connection.
-		new_exit.to = outConnections[-1]
-	return new_exit
-
-
-def read_exits(version, infileobj):
-	exits = []
-	exit_names = ("north", "south", "east", "west", "up", "down", "unknown")
-	for exit_name in exit_names:
-		new_exit = read_exit(version, infileobj)
-		if new_exit.exitFlags:
-			new_exit.dir = exit_name
-			exits.append(new_exit)
-	return exits
-
-
-def read_room(version, infileobj):
-	new_room = Room()
-	new_room.name = read_qstring(infileobj)
-	new_room.desc = read_qstring(infileobj)
-	new_room.dynamicDesc = read_qstring(infileobj)
-	new_room.id = str(read_uint32(infileobj))
-	new_room.note = read_qstring(infileobj)
-	new_room.terrain = terrain_type[read_uint8(infileobj)]
-	new_room.light = light_type[read_uint8(infileobj)]
-	new_room.align = align_type[read_uint8(infileobj)]
-	new_room.portable = portable_type[read_uint8(infileobj)]
-	if version >= 030:
-		new_room.ridable = ridable_type[read_uint8(infileobj)]
-	if version >= 041:
-		new_room.sundeath = sundeath_type[read_uint8(infileobj)]
-		new_room.mobFlags = mobflags.bits_to_flag_set(read_uint32(infileobj))
-		new_room.loadFlags = loadflags.bits_to_flag_set(read_uint32(infileobj))
-	else:
-		new_room.mobFlags = mobflags.bits_to_flag_set(read_uint16(infileobj))
-		new_room.loadFlags = loadflags.bits_to_flag_set(read_uint16(infileobj))
-	new_room.updated = bool(read_uint8(infileobj))
-	new_room.x = read_int32(infileobj)
-	new_room.y = read_int32(infileobj)
-	new_room.z = read_int32(infileobj)
-	new_room.exits = read_exits(version, infileobj) #[x for x in read_exits(version, infileobj)]
-	return new_room
-
-
-class InfoMark(object):
-	type = "text"
-	cls = "generic"
-	rotation_angle = 0.0
-
-
-def read_mark(version, infileobj):
-	mark = InfoMark()
-	mark.name = read_qstring(infileobj)
-	mark.text = read_qstring(infileobj)
-	jd = read_uint32(infileobj) # Julian day number
-	if jd == 0:
-		# QDate objects don't have a year 0.
-		jd = None
-	ms = read_uint32(infileobj) # Milliseconds since midnight
-	if ms == UINT32_MAX:
-		ms = None
-	tz = read_uint8(infileobj) # 0 = local time, 1 = UTC
-	if tz == UINT8_MAX:
-		tz = None
-	mark.time_stamp = jd2gcal(jd, ms, tz)
-	mark.type = info_mark_type[read_uint8(infileobj)]
-	if version >= 040:
-		mark.cls = info_mark_class[read_uint8(infileobj)]
-		mark.rotation_angle = read_uint32(infileobj) / 100.0
-	mark.pos1 = {
-		"x": read_int32(infileobj) / 100.0,
-		"y": read_int32(infileobj) / 100.0,
-		"z": read_int32(infileobj)
-	}
-	mark.pos2 = {
-		"x": read_int32(infileobj) / 100.0,
-		"y": read_int32(infileobj) / 100.0,
-		"z": read_int32(infileobj)
-	}
-	return mark
-
-
-def decompress_mmapper_data(version, infileobj):
-	if version >= 042:
-		# As of version 042 of the MMapper data format, MMapper uses qCompress and qUncompress from the QByteArray class for data compression.
-		# From the web page at
-		# https://doc.qt.io/archives/qt-5.7/qbytearray.html#qUncompress
-		# "Note: If you want to use this function to uncompress external data that was compressed using zlib, you first need to prepend a four byte header to the byte array containing the data. The header must contain the expected length (in bytes) of the uncompressed data, expressed as an unsigned, big-endian, 32-bit integer."
-		# We can therefore assume that MMapper data files with version 042 or later are compressed using standard zlib with a non-standard 4-byte header.
-		header = read_uint32(infileobj)
-	BLOCK_SIZE = 8192
-	decompressor = zlib.decompressobj()
-	decompressed_stream = cStringIO.StringIO()
-	compressed_data = infileobj.read(BLOCK_SIZE)
-	while compressed_data:
-		decompressed_stream.write(decompressor.decompress(compressed_data))
-		compressed_data = infileobj.read(BLOCK_SIZE)
-	decompressed_stream.seek(0)
-	return decompressed_stream
-
-
-def read_mmapper_data(filename):
-	with open(filename, "rb") as infileobj:
-		num = read_uint32(infileobj)
-		if num != MMAPPER_MAGIC:
-			raise BadMagicNumberException()
-		version = read_int32(infileobj)
-		if version not in MMAPPER_VERSIONS:
-			raise UnsupportedVersionException(version)
-		decompressed_stream = decompress_mmapper_data(version, infileobj)
-	data = MMapperData()
-	data.version = version
-	rooms_count = read_uint32(decompressed_stream)
-	marks_count = read_uint32(decompressed_stream)
-	data.selected = (read_int32(decompressed_stream), read_int32(decompressed_stream), read_int32(decompressed_stream))
-	for i in xrange(rooms_count):
-		room = read_room(version, decompressed_stream)
-		data.rooms[room.id] = room
-	for i in xrange(marks_count):
-		data.marks.append(read_mark(version, decompressed_stream))
-	return data
-
-
-class Database(object):
-	"""MMapper database class"""
-
-	def __init__(self, fileName):
-		with open(fileName, 'rb') as infileobj:
-			num = read_uint32(infileobj)
-			if num != MMAPPER_MAGIC:
-				raise BadMagicNumberException()
-			version = read_int32(infileobj)
-			if version not in MMAPPER_VERSIONS:
-				raise UnsupportedVersionException(version)
-			decompressedStream = decompress_mmapper_data(version, infileobj)
-		roomsCount = read_uint32(decompressedStream)
-		marksCount = read_uint32(decompressedStream)
-		self.selected = (read_int32(decompressedStream), read_int32(decompressedStream), read_int32(decompressedStream))
-		# iterate through the rooms in the database, creating an object for each room.
-		deathIDs = []
-		self.rooms = {}
-		for i in xrange(roomsCount):
-			newRoom = read_room(version, decompressedStream)
-			if newRoom.terrain == "DEATH":
-				deathIDs.append(newRoom.id)
-			else:
-				newRoom.setCost(newRoom.terrain)
-				self.rooms[newRoom.id] = newRoom
-		for roomID, room in self.rooms.iteritems():
-			for item in room.exits:
-				if item.to in deathIDs:
-					item.to = "DEATH"
+﻿# This module was originally written by Chris Brannon.
+# https://github.com/CMB
+# Chris has graciously placed the source code of this module in the public domain.
+
+import cStringIO
+import itertools
+import math
+import multiprocessing
+import struct
+import threading
+import zlib
+
+from jd2gcal import jd2gcal
+from rooms import Room, Exit, NamedBitFlags, TextPool, mobflags, loadflags, exitflags, doorflags
+
+
+# The width and height, in rooms, of the cells in the info mark index.
+MARK_CELL_SIZE = 8
+UINT8_MAX = 0xff
+UINT32_MAX = 0xffffffff
+MMAPPER_MAGIC = 0xffb2af01
+MMAPPER_VERSIONS = (031, 040, 041, 042)
+EXIT_FLAG_EXIT = exitflags.map_by_name["exit"]
+EXIT_FLAG_DOOR = exitflags.map_by_name["door"]
+# The number of chunks of rooms given to each worker process when decoding in parallel.
+CHUNKS_PER_PROCESS = 4
+UINT32_STRUCT = struct.Struct(">I")
+CONNECTIONS_TERMINATOR = UINT32_STRUCT.pack(UINT32_MAX)
+ROOM_TEXT_FIELDS = ("name", "desc", "dynamicDesc", "note")
+# The room fields whose values come from the type tables below, such as terrain_type.
+ROOM_TYPE_FIELDS = ("terrain", "light", "align", "portable", "ridable", "sundeath")
+EXIT_NAMES = ("north", "south", "east", "west", "up", "down", "unknown")
+OPPOSITE_EXIT_NAMES = {"north": "south", "south": "north", "east": "west", "west": "east", "up": "down", "down": "up"}
+# The number of bytes collected before they're passed to the compressor when writing a database.
+WRITE_BLOCK_SIZE = 65536
+
+# The version and decompressed data of the database being decoded by a worker process.
+_shared_data = None
+
+
+class MMapperException(Exception):
+	pass
+
+
+class IncompleteDataFileException(MMapperException):
+	pass
+
+
+class BadMagicNumberException(MMapperException):
+	pass
+
+
+class UnsupportedVersionException(MMapperException):
+	def __init__(self, number):
+		MMapperException.__init__(self, "Do not support version %d of mmapper data" % number)
+
+
+# Need to clean up these classes later.
+# There's no encapsulation here at all.
+class MMapperData(object):
+	# Fields: rooms, selected (a position)
+	def __init__(self):
+		self.rooms = {}
+		self.marks = []
+
+
+align_type = {
+	0: "undefined",
+	1: "good",
+	2: "neutral",
+	3: "evil"}
+
+info_mark_type = {
+	0: "text",
+	1: "line",
+	2: "arrow"
+}
+
+info_mark_class = {
+	0: "generic",
+	1: "herb",
+	2: "river",
+	3: "place",
+	4: "mob",
+	5: "comment",
+	6: "road",
+	7: "object",
+	8: "action",
+	9: "locality"
+}
+
+light_type = {
+	0: "undefined",
+	1: "dark",
+	2: "lit"}
+
+portable_type = {
+	0: "undefined",
+	1: "portable",
+	2: "notportable"}
+
+ridable_type = {
+	0: "undefined",
+	1: "ridable",
+	2: "notridable"}
+
+sundeath_type = {
+	0: "undefined",
+	1: "sundeath",
+	2: "nosundeath"}
+
+terrain_type = {
+	0: "undefined",
+	1: "indoors",
+	2: "city",
+	3: "field",
+	4: "forest",
+	5: "hills",
+	6: "mountains",
+	7: "shallowwater",
+	8: "water",
+	9: "rapids",
+	10: "underwater",
+	11: "road",
+	12: "brush",
+	13: "tunnel",
+	14: "cavern",
+	15: "death",
+	16: "random"
+}
+
+
+def read_uint32(infileobj):
+	data = infileobj.read(4)
+	if len(data) != 4:
+		raise IncompleteDataFileException()
+	return struct.unpack(">I", data)[0]
+
+
+def read_int32(infileobj):
+	data = infileobj.read(4)
+	if len(data) != 4:
+		raise IncompleteDataFileException()
+	return struct.unpack(">i", data)[0]
+
+
+def read_uint16(infileobj):
+	data = infileobj.read(2)
+	if len(data) != 2:
+		raise IncompleteDataFileException()
+	return struct.unpack(">H", data)[0]
+
+
+def read_int16(infileobj):
+	data = infileobj.read(2)
+	if len(data) != 2:
+		raise IncompleteDataFileException()
+	return struct.unpack(">h", data)[0]
+
+
+def read_uint8(infileobj):
+	data = infileobj.read(1)
+	if len(data) != 1:
+		raise IncompleteDataFileException()
+	return struct.unpack("B", data)[0]
+
+
+def read_int8(infileobj):
+	data = infileobj.read(1)
+	if len(data) != 1:
+		raise IncompleteDataFileException()
+	return struct.unpack("b", data)[0]
+
+
+def read_qstring(infileobj, text_pool=None):
+	length = read_uint32(infileobj)
+	if length == UINT32_MAX:
+		return ""
+	ucs_data = infileobj.read(length)
+	if len(ucs_data) != length:
+		raise IncompleteDataFileException()
+	if text_pool is not None:
+		# Repeated text is looked up by its raw bytes, so it's only decoded once.
+		return text_pool.decode(ucs_data, "UTF_16_BE")
+	return ucs_data.decode("UTF_16_BE")
+
+
+def read_exit(version, infileobj, text_pool=None):
+	"""Reads an exit from infileobj, returning None if the exit has no flags set"""
+	if version >= 041:
+		exit_flag_bits = read_uint16(infileobj)
+	else:
+		exit_flag_bits = read_uint8(infileobj)
+	if version >= 040:
+		door_flag_bits = read_uint16(infileobj)
+	else:
+		door_flag_bits = read_uint8(infileobj)
+	door = read_qstring(infileobj, text_pool)
+	# Inbound connections are unneeded.
+	connection = read_uint32(infileobj)
+	while connection != UINT32_MAX:
+		connection = read_uint32(infileobj)
+	outConnections = []
+	connection = read_uint32(infileobj)
+	while connection != UINT32_MAX:
+		outConnections.append(str(connection))
+		connection = read_uint32(infileobj)
+	if not exit_flag_bits:
+		# Exits without flags are discarded, so there's no need to create an object for them.
+		return None
+	new_exit = Exit()
+	new_exit.exitFlagBits = exit_flag_bits
+	new_exit.doorFlagBits = door_flag_bits
+	new_exit.door = door
+	if exit_flag_bits & EXIT_FLAG_DOOR:
+		new_exit.exitFlagBits |= EXIT_FLAG_EXIT
+		if not new_exit.door:
+			new_exit.door = "exit"
+	if not outConnections:
+		new_exit.to = "undefined"
+	else:
+		# We want the last outbound connection.
+		new_exit.to = outConnections[-1]
+	return new_exit
+
+
+def read_exits(version, infileobj, text_pool=None):
+	exits = []
+	for exit_name in EXIT_NAMES:
+		new_exit = read_exit(version, infileobj, text_pool)
+		if new_exit is not None:
+			new_exit.dir = exit_name
+			exits.append(new_exit)
+	return exits
+
+
+def read_room(version, infileobj, text_pool=None):
+	new_room = Room()
+	new_room.name = read_qstring(infileobj, text_pool)
+	new_room.desc = read_qstring(infileobj, text_pool)
+	new_room.dynamicDesc = read_qstring(infileobj, text_pool)
+	new_room.id = str(read_uint32(infileobj))
+	new_room.note = read_qstring(infileobj, text_pool)
+	new_room.terrain = terrain_type[read_uint8(infileobj)]
+	new_room.light = light_type[read_uint8(infileobj)]
+	new_room.align = align_type[read_uint8(infileobj)]
+	new_room.portable = portable_type[read_uint8(infileobj)]
+	if version >= 030:
+		new_room.ridable = ridable_type[read_uint8(infileobj)]
+	if version >= 041:
+		new_room.sundeath = sundeath_type[read_uint8(infileobj)]
+		new_room.mobFlagBits = read_uint32(infileobj)
+		new_room.loadFlagBits = read_uint32(infileobj)
+	else:
+		new_room.mobFlagBits = read_uint16(infileobj)
+		new_room.loadFlagBits = read_uint16(infileobj)
+	new_room.updated = bool(read_uint8(infileobj))
+	new_room.x = read_int32(infileobj)
+	new_room.y = read_int32(infileobj)
+	new_room.z = read_int32(infileobj)
+	new_room.exits = read_exits(version, infileobj, text_pool) #[x for x in read_exits(version, infileobj)]
+	return new_room
+
+
+def index_room_records(version, data, offset, rooms_count):
+	"""
+	Returns a list of the offsets in data where each room record starts, followed by the offset where the last one ends.
+	Only the length prefixes of the strings and the terminators of the connection lists are read, so this is much faster than decoding the rooms.
+	"""
+	# The size of the fields between the note and the exits, from the terrain to the coordinates.
+	room_fields_size = 4 + (1 if version >= 030 else 0) + (1 + 8 if version >= 041 else 4) + 1 + 12
+	exit_flags_size = (2 if version >= 041 else 1) + (2 if version >= 040 else 1)
+	unpack_uint32 = UINT32_STRUCT.unpack_from
+	find = data.find
+	offsets = []
+	pos = offset
+	try:
+		for i in xrange(rooms_count):
+			offsets.append(pos)
+			# The name, description, dynamic description, ID, and note.
+			for field in xrange(4):
+				if field == 3:
+					pos += 4
+				length = unpack_uint32(data, pos)[0]
+				pos += 4 if length == UINT32_MAX else 4 + length
+			pos += room_fields_size
+			for exit in xrange(7):
+				pos += exit_flags_size
+				length = unpack_uint32(data, pos)[0]
+				pos += 4 if length == UINT32_MAX else 4 + length
+				# The inbound and outbound connections are lists of 4-byte room IDs, each ending with UINT32_MAX.
+				for connections in xrange(2):
+					end = find(CONNECTIONS_TERMINATOR, pos)
+					# The terminator bytes may also occur across 2 room IDs, so only a match on a room ID boundary counts.
+					while end >= 0 and (end - pos) % 4:
+						end = find(CONNECTIONS_TERMINATOR, end + 1)
+					if end < 0:
+						raise IncompleteDataFileException()
+					pos = end + 4
+	except struct.error:
+		raise IncompleteDataFileException()
+	if pos > len(data):
+		raise IncompleteDataFileException()
+	offsets.append(pos)
+	return offsets
+
+
+def _init_room_decoder(version, data):
+	global _shared_data
+	_shared_data = (version, data)
+
+
+def _decode_rooms(chunk):
+	start, count = chunk
+	version, data = _shared_data
+	# A cStringIO object created from a string reads from that string directly, rather than copying it.
+	stream = cStringIO.StringIO(data)
+	stream.seek(start)
+	rooms = [read_room(version, stream) for i in xrange(count)]
+	# Room objects are slow to send between processes, so they are sent as compact records instead.
+	# Every room read by read_room has the same attributes, as does every exit, so each record only holds the attribute values, and the names are sent once per chunk.
+	room_keys = tuple(key for key in vars(rooms[0]) if key != "exits")
+	exit_keys = ("dir", "to", "door", "exitFlagBits", "doorFlagBits")
+	records = []
+	for room in rooms:
+		attributes = vars(room)
+		exits = [tuple(vars(exit)[key] for key in exit_keys) for exit in room.exits]
+		records.append((tuple(attributes[key] for key in room_keys), exits))
+	return room_keys, exit_keys, records
+
+
+def read_rooms_parallel(version, data, offset, rooms_count, processes, text_pool):
+	"""
+	Decodes the room records starting at offset in data, using a pool of worker processes.
+	Repeated text in the rooms is shared through text_pool as the rooms are received.
+	Returns an iterator over the rooms in the order they appear in data, and the offset where the room records end.
+	"""
+	offsets = index_room_records(version, data, offset, rooms_count)
+	end = offsets.pop()
+	chunk_size = rooms_count // (processes * CHUNKS_PER_PROCESS) + 1
+	chunks = [(offsets[i], min(chunk_size, rooms_count - i)) for i in xrange(0, rooms_count, chunk_size)]
+	# Forked worker processes share the parent's copy of the decompressed data, rather than receiving it through a pipe.
+	pool = multiprocessing.Pool(processes, initializer=_init_room_decoder, initargs=(version, data))
+	return _iter_pool_rooms(pool, chunks, text_pool), end
+
+
+def _iter_pool_rooms(pool, chunks, text_pool):
+	try:
+		# The chunks are returned in order, each one as soon as it and the ones before it are decoded.
+		for room_keys, exit_keys, records in pool.imap(_decode_rooms, chunks):
+			# The serial loader shares the strings in the type tables and EXIT_NAMES, and the "undefined" destination, between rooms, but unpickled rooms get copies of them.
+			# Those strings are literals, which Python interns, so interning the copies gives back the same strings the serial loader uses.
+			type_keys = [key for key in ROOM_TYPE_FIELDS if key in room_keys]
+			for values, exits in records:
+				new_room = Room()
+				new_room.__dict__.update(itertools.izip(room_keys, values))
+				for key in ROOM_TEXT_FIELDS:
+					setattr(new_room, key, text_pool.intern(getattr(new_room, key)))
+				for key in type_keys:
+					setattr(new_room, key, intern(getattr(new_room, key)))
+				new_room.exits = []
+				for exit_values in exits:
+					new_exit = Exit()
+					new_exit.__dict__.update(itertools.izip(exit_keys, exit_values))
+					new_exit.door = text_pool.intern(new_exit.door)
+					new_exit.dir = intern(new_exit.dir)
+					if new_exit.to == "undefined":
+						new_exit.to = intern(new_exit.to)
+					new_room.exits.append(new_exit)
+				yield new_room
+	finally:
+		pool.close()
+		pool.join()
+
+
+class InfoMark(object):
+	type = "text"
+	cls = "generic"
+	rotation_angle = 0.0
+
+	@property
+	def time_stamp(self):
+		# The conversion is only done when the time stamp is used.
+		return jd2gcal(self.julian_day, self.milliseconds, self.time_zone)
+
+
+def read_mark(version, infileobj):
+	mark = InfoMark()
+	mark.name = read_qstring(infileobj)
+	mark.text = read_qstring(infileobj)
+	jd = read_uint32(infileobj) # Julian day number
+	if jd == 0:
+		# QDate objects don't have a year 0.
+		jd = None
+	ms = read_uint32(infileobj) # Milliseconds since midnight
+	if ms == UINT32_MAX:
+		ms = None
+	tz = read_uint8(infileobj) # 0 = local time, 1 = UTC
+	if tz == UINT8_MAX:
+		tz = None
+	mark.julian_day, mark.milliseconds, mark.time_zone = jd, ms, tz
+	mark.type = info_mark_type[read_uint8(infileobj)]
+	if version >= 040:
+		mark.cls = info_mark_class[read_uint8(infileobj)]
+		mark.rotation_angle = read_uint32(infileobj) / 100.0
+	mark.pos1 = {
+		"x": read_int32(infileobj) / 100.0,
+		"y": read_int32(infileobj) / 100.0,
+		"z": read_int32(infileobj)
+	}
+	mark.pos2 = {
+		"x": read_int32(infileobj) / 100.0,
+		"y": read_int32(infileobj) / 100.0,
+		"z": read_int32(infileobj)
+	}
+	return mark
+
+
+class InfoMarkIndex(object):
+	"""A grid of cells on each z-level, each holding the info marks that overlap it"""
+
+	def __init__(self, marks):
+		self.cells = {}
+		for mark in marks:
+			x1, x2 = sorted((mark.pos1["x"], mark.pos2["x"]))
+			y1, y2 = sorted((mark.pos1["y"], mark.pos2["y"]))
+			z1, z2 = sorted((mark.pos1["z"], mark.pos2["z"]))
+			mark.bounds = (x1, y1, z1, x2, y2, z2)
+			for z in xrange(z1, z2 + 1):
+				for cellX in xrange(int(math.floor(x1 / MARK_CELL_SIZE)), int(math.floor(x2 / MARK_CELL_SIZE)) + 1):
+					for cellY in xrange(int(math.floor(y1 / MARK_CELL_SIZE)), int(math.floor(y2 / MARK_CELL_SIZE)) + 1):
+						self.cells.setdefault((cellX, cellY, z), []).append(mark)
+
+	def at(self, x, y, z):
+		"""Returns a list of the info marks overlapping the room at the given coordinates"""
+		# A room covers the square from its coordinates to its coordinates + 1.
+		result = []
+		for mark in self.cells.get((x // MARK_CELL_SIZE, y // MARK_CELL_SIZE, z), ()):
+			x1, y1, z1, x2, y2, z2 = mark.bounds
+			if x1 < x + 1 and x2 >= x and y1 < y + 1 and y2 >= y:
+				result.append(mark)
+		return result
+
+
+def decompress_mmapper_data(version, infileobj):
+	if version >= 042:
+		# As of version 042 of the MMapper data format, MMapper uses qCompress and qUncompress from the QByteArray class for data compression.
+		# From the web page at
+		# https://doc.qt.io/archives/qt-5.7/qbytearray.html#qUncompress
+		# "Note: If you want to use this function to uncompress external data that was compressed using zlib, you first need to prepend a four byte header to the byte array containing the data. The header must contain the expected length (in bytes) of the uncompressed data, expressed as an unsigned, big-endian, 32-bit integer."
+		# We can therefore assume that MMapper data files with version 042 or later are compressed using standard zlib with a non-standard 4-byte header.
+		header = read_uint32(infileobj)
+	BLOCK_SIZE = 8192
+	decompressor = zlib.decompressobj()
+	decompressed_stream = cStringIO.StringIO()
+	compressed_data = infileobj.read(BLOCK_SIZE)
+	while compressed_data:
+		decompressed_stream.write(decompressor.decompress(compressed_data))
+		compressed_data = infileobj.read(BLOCK_SIZE)
+	decompressed_stream.seek(0)
+	return decompressed_stream
+
+
+def read_mmapper_data(filename):
+	with open(filename, "rb") as infileobj:
+		num = read_uint32(infileobj)
+		if num != MMAPPER_MAGIC:
+			raise BadMagicNumberException()
+		version = read_int32(infileobj)
+		if version not in MMAPPER_VERSIONS:
+			raise UnsupportedVersionException(version)
+		decompressed_stream = decompress_mmapper_data(version, infileobj)
+	data = MMapperData()
+	data.version = version
+	rooms_count = read_uint32(decompressed_stream)
+	marks_count = read_uint32(decompressed_stream)
+	data.selected = (read_int32(decompressed_stream), read_int32(decompressed_stream), read_int32(decompressed_stream))
+	for i in xrange(rooms_count):
+		room = read_room(version, decompressed_stream)
+		data.rooms[room.id] = room
+	for i in xrange(marks_count):
+		data.marks.append(read_mark(version, decompressed_stream))
+	return data
+
+
+def reverse_lookup(table):
+	"""Returns a dict mapping the names in one of the type tables above to their numbers"""
+	return dict((name, number) for number, name in table.iteritems())
+
+
+align_codes = reverse_lookup(align_type)
+info_mark_type_codes = reverse_lookup(info_mark_type)
+info_mark_class_codes = reverse_lookup(info_mark_class)
+light_codes = reverse_lookup(light_type)
+portable_codes = reverse_lookup(portable_type)
+ridable_codes = reverse_lookup(ridable_type)
+sundeath_codes = reverse_lookup(sundeath_type)
+terrain_codes = reverse_lookup(terrain_type)
+
+
+class CompressedWriter(object):
+	"""A file-like object that compresses the data written to it into outfileobj, counting the bytes written before compression"""
+
+	def __init__(self, outfileobj):
+		self.outfileobj = outfileobj
+		self.compressor = zlib.compressobj()
+		self.size = 0
+		# Small writes are collected into blocks before they're compressed, because each call to the compressor has an overhead.
+		self.buffer = []
+		self.buffered = 0
+
+	def write(self, data):
+		self.size += len(data)
+		self.buffer.append(data)
+		self.buffered += len(data)
+		if self.buffered >= WRITE_BLOCK_SIZE:
+			self.flush_buffer()
+
+	def flush_buffer(self):
+		self.outfileobj.write(self.compressor.compress("".join(self.buffer)))
+		self.buffer = []
+		self.buffered = 0
+
+	def close(self):
+		self.flush_buffer()
+		self.outfileobj.write(self.compressor.flush())
+
+
+def write_qstring(outfileobj, text):
+	if not text:
+		# Empty strings are written as null strings.
+		outfileobj.write(UINT32_STRUCT.pack(UINT32_MAX))
+		return
+	data = text.encode("UTF_16_BE")
+	outfileobj.write(UINT32_STRUCT.pack(len(data)))
+	outfileobj.write(data)
+
+
+def write_exit(outfileobj, exit, inbound):
+	"""Writes an exit to outfileobj, or an empty exit if exit is None. inbound is a list of the IDs of the rooms linking into the exit"""
+	if exit is None:
+		outfileobj.write(struct.pack(">HH", 0, 0))
+		write_qstring(outfileobj, "")
+	else:
+		# Exits from Pandora maps have no flags, but an exit without flags would be discarded when the file is read.
+		exit_flag_bits = exit.exitFlagBits | EXIT_FLAG_EXIT
+		door = getattr(exit, "door", "")
+		if door:
+			exit_flag_bits |= EXIT_FLAG_DOOR
+		if door == "exit":
+			# The loader names doors without a name 'exit', so the name is dropped again.
+			door = ""
+		outfileobj.write(struct.pack(">HH", exit_flag_bits, exit.doorFlagBits))
+		write_qstring(outfileobj, door)
+	outfileobj.write("".join(UINT32_STRUCT.pack(room_number(room_id)) for room_id in inbound))
+	outfileobj.write(CONNECTIONS_TERMINATOR)
+	if exit is not None and exit.to.isdigit():
+		outfileobj.write(UINT32_STRUCT.pack(room_number(exit.to)))
+	outfileobj.write(CONNECTIONS_TERMINATOR)
+
+
+def room_number(room_id):
+	"""Returns a room ID as the number stored in the database, raising MMapperException if it can't be stored"""
+	if not room_id.isdigit() or int(room_id) >= UINT32_MAX:
+		raise MMapperException("Room ID %s is not a number that can be stored in an MMapper database" % room_id)
+	return int(room_id)
+
+
+def room_coordinates(room):
+	"""Returns the x, y, and z coordinates of a room as integers, raising MMapperException if any of them are missing or invalid"""
+	try:
+		coordinates = tuple(int(getattr(room, axis)) for axis in ("x", "y", "z"))
+	except (AttributeError, TypeError, ValueError):
+		raise MMapperException("Room %s has missing or invalid coordinates" % room.id)
+	if not all(-2 ** 31 <= value < 2 ** 31 for value in coordinates):
+		raise MMapperException("The coordinates of room %s are too large for an MMapper database" % room.id)
+	return coordinates
+
+
+def write_room(outfileobj, room, inbound=None):
+	"""
+	Writes a room to outfileobj in the version 042 format.
+	If inbound is given, it maps each direction to a list of the IDs of the rooms linking into that exit.
+	Exits leading to 'undefined' or 'DEATH' are written without an outbound connection, because MMapper only links exits to rooms.
+	Raises MMapperException, naming the room, if its ID or coordinates can't be stored.
+	"""
+	# The room is checked before any of it is written.
+	room_id = room_number(room.id)
+	x, y, z = room_coordinates(room)
+	write_qstring(outfileobj, getattr(room, "name", ""))
+	write_qstring(outfileobj, getattr(room, "desc", ""))
+	write_qstring(outfileobj, getattr(room, "dynamicDesc", ""))
+	outfileobj.write(UINT32_STRUCT.pack(room_id))
+	write_qstring(outfileobj, getattr(room, "note", ""))
+	outfileobj.write(struct.pack(
+		"BBBBBB",
+		# Pandora terrain names are upper case.
+		terrain_codes.get(getattr(room, "terrain", "undefined").lower(), 0),
+		light_codes.get(getattr(room, "light", "undefined"), 0),
+		align_codes.get(getattr(room, "align", "undefined"), 0),
+		portable_codes.get(getattr(room, "portable", "undefined"), 0),
+		ridable_codes.get(getattr(room, "ridable", "undefined"), 0),
+		sundeath_codes.get(getattr(room, "sundeath", "undefined"), 0)))
+	outfileobj.write(struct.pack(">IIBiii", room.mobFlagBits, room.loadFlagBits, bool(getattr(room, "updated", False)), x, y, z))
+	exits = dict((exit.dir, exit) for exit in room.exits)
+	inbound = inbound or {}
+	for exit_name in EXIT_NAMES:
+		write_exit(outfileobj, exits.get(exit_name), inbound.get(exit_name, ()))
+
+
+def write_mark(outfileobj, mark):
+	write_qstring(outfileobj, mark.name)
+	write_qstring(outfileobj, mark.text)
+	outfileobj.write(struct.pack(
+		">IIBBBI",
+		# A missing date, time, or time zone is written as the value that read_mark turns into None.
+		mark.julian_day or 0,
+		UINT32_MAX if mark.milliseconds is None else mark.milliseconds,
+		UINT8_MAX if mark.time_zone is None else mark.time_zone,
+		info_mark_type_codes[mark.type],
+		info_mark_class_codes[mark.cls],
+		int(round(mark.rotation_angle * 100))))
+	for pos in (mark.pos1, mark.pos2):
+		outfileobj.write(struct.pack(">iii", int(round(pos["x"] * 100)), int(round(pos["y"] * 100)), pos["z"]))
+
+
+def inbound_connections(rooms, inbound=None):
+	"""
+	Returns a dict mapping the ID of every room that is linked to from rooms to a dict mapping directions to lists of the IDs of the rooms linking into it.
+	A link arrives through the exit opposite the one it leaves by, as MMapper stores them.
+	If inbound is given, the links are added to it, so the rooms can be passed a few at a time.
+	"""
+	if inbound is None:
+		inbound = {}
+	for room in rooms:
+		# The IDs of the linking rooms are stored with the rooms they lead to, so a bad ID is reported here, before anything is written.
+		room_number(room.id)
+		for exit in room.exits:
+			if exit.to.isdigit():
+				direction = OPPOSITE_EXIT_NAMES.get(exit.dir, "unknown")
+				inbound.setdefault(exit.to, {}).setdefault(direction, []).append(room.id)
+	return inbound
+
+
+def write_mmapper_data(outfileobj, rooms, rooms_count, marks=(), selected=(0, 0, 0), inbound=None):
+	"""
+	Writes rooms and marks to outfileobj as a version 042 MMapper database.
+	rooms can be any iterable, including a generator, so the rooms don't have to be in memory at once, but rooms_count must be the number of rooms it yields.
+	inbound is a dict as returned by inbound_connections. The data is compressed as it is written, and outfileobj must be seekable, because the size of the uncompressed data is filled in at the end.
+	"""
+	marks = list(marks)
+	outfileobj.write(struct.pack(">Ii", MMAPPER_MAGIC, 042))
+	size_offset = outfileobj.tell()
+	# The size is written once the data has been compressed.
+	outfileobj.write(UINT32_STRUCT.pack(0))
+	writer = CompressedWriter(outfileobj)
+	writer.write(struct.pack(">IIiii", rooms_count, len(marks), selected[0], selected[1], selected[2]))
+	inbound = inbound or {}
+	written = 0
+	for room in rooms:
+		room_stream = cStringIO.StringIO()
+		write_room(room_stream, room, inbound.get(room.id))
+		writer.write(room_stream.getvalue())
+		written += 1
+	if written != rooms_count:
+		raise MMapperException("Expected %d rooms, but %d were written" % (rooms_count, written))
+	for mark in marks:
+		mark_stream = cStringIO.StringIO()
+		write_mark(mark_stream, mark)
+		writer.write(mark_stream.getvalue())
+	writer.close()
+	if writer.size > UINT32_MAX:
+		raise MMapperException("The database is too large for the version 042 format")
+	end = outfileobj.tell()
+	outfileobj.seek(size_offset)
+	outfileobj.write(UINT32_STRUCT.pack(writer.size))
+	outfileobj.seek(end)
+	return writer.size
+
+
+class Database(object):
+	"""MMapper database class"""
+
+	def __init__(self, fileName, rooms=None, roomLoaded=None, processes=None):
+		"""
+		Loads the rooms from fileName into the rooms dict, or a new dict if rooms is None.
+		If roomLoaded is given, it will be called with every room after the room is added, including death traps which are never added.
+		If processes is given, the rooms will be decoded in that many worker processes.
+		"""
+		with open(fileName, 'rb') as infileobj:
+			num = read_uint32(infileobj)
+			if num != MMAPPER_MAGIC:
+				raise BadMagicNumberException()
+			version = read_int32(infileobj)
+			if version not in MMAPPER_VERSIONS:
+				raise UnsupportedVersionException(version)
+			decompressedStream = decompress_mmapper_data(version, infileobj)
+		roomsCount = read_uint32(decompressedStream)
+		marksCount = read_uint32(decompressedStream)
+		self.selected = (read_int32(decompressedStream), read_int32(decompressedStream), read_int32(decompressedStream))
+		# iterate through the rooms in the database, creating an object for each room.
+		# Rooms with the same text share a single copy of it.
+		self.textPool = TextPool()
+		if processes:
+			newRooms, end = read_rooms_parallel(version, decompressedStream.getvalue(), decompressedStream.tell(), roomsCount, processes, self.textPool)
+			decompressedStream.seek(end)
+		else:
+			newRooms = (read_room(version, decompressedStream, self.textPool) for i in xrange(roomsCount))
+		deathIDs = set()
+		self.rooms = {} if rooms is None else rooms
+		for newRoom in newRooms:
+			if newRoom.terrain == "DEATH":
+				deathIDs.add(newRoom.id)
+			else:
+				newRoom.setCost(newRoom.terrain)
+				self.rooms[newRoom.id] = newRoom
+			if roomLoaded is not None:
+				roomLoaded(newRoom)
+		self.textPool.close()
+		for roomID, room in self.rooms.iteritems():
+			for item in room.exits:
+				if item.to in deathIDs:
+					item.to = "DEATH"
+		# The info marks are only parsed when they are first used. Until then, only the undecoded marks section is kept.
+		self.version = version
+		self.marksCount = marksCount
+		self.marksOffset = decompressedStream.tell()
+		self.marksData = decompressedStream.read()
+		self.marksIndex = None
+		self.marksLock = threading.Lock()
+
+	def getMarksIndex(self):
+		"""Returns the spatial index of the info marks, parsing the marks the first time it's called"""
+		with self.marksLock:
+			if self.marksIndex is None:
+				stream = cStringIO.StringIO(self.marksData)
+				self.marksIndex = InfoMarkIndex([read_mark(self.version, stream) for i in xrange(self.marksCount)])
+				self.marksData = None
+		return self.marksIndex
+
+	def marksAt(self, room):
+		"""Returns a list of the info marks that overlap a room"""
+		return self.getMarksIndex().at(room.x, room.y, room.z)
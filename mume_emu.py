@@ -1,357 +1,1411 @@
-﻿#!/usr/bin/env python2
-
-import argparse
-import heapq
-import itertools
-import json
-import re
-import subprocess
-import textwrap
-
-import mmapper
-import pandora
-import terminalsize
-
-ANSI_COLOR_REGEXP = re.compile(ur"[\n]?\x1b\[[0-9;]+[m][\n]?")
-
-
-class World(object):
-	"""The main world class"""
-	width, height = terminalsize.get_terminal_size()
-
-	def __init__(self, **kwargs):
-		self.configFile = kwargs.get("configFile")
-		# Load the configuration file.
-		with open(self.configFile, "rb") as data:
-			self.config = json.load(data, encoding="UTF-8")
-		# Set up the labels dict inside the configuration if it isn't there.
-		if "labels" not in self.config:
-			self.config["labels"] = {}
-		DB = kwargs.get("DBClass")
-		self.rooms = DB(kwargs.get("databaseFile")).rooms
-		# Set the initial room to the room that the user was in when the program last terminated.
-		lastID = self.config.get("last_id")
-		if lastID not in self.rooms:
-			lastID = sorted(self.rooms.keys())[0]
-		self.room = self.rooms[lastID]
-
-	def filterAnsi(self, text):
-		return ANSI_COLOR_REGEXP.sub('', text)
-
-	def page(self, lines):
-		if len(lines) < self.height:
-			print "\n".join(lines)
-		else:
-			less = subprocess.Popen("less", stdin=subprocess.PIPE)
-			less.stdin.write("\n".join(lines).encode("utf-8"))
-			less.stdin.close()
-			less.wait()
-
-	def look(self):
-		"""What to do when the user types 'look', enters a new room, ETC"""
-		print self.filterAnsi(getattr(self.room, "name"))
-		# If brief mode is disabled
-		if not self.config.get("brief"):
-			# In Pandora databases, The description text uses '|' (bar) as an end of line character. We need to replace these with '\n' new line characters before splitting the description by lines and doing our own word wrapping.
-			desc = getattr(self.room, "desc", "").replace("|", "\n").splitlines()
-			# Now we need to strip any whitespace characters from the description lines, as well as filtering out any blank lines.
-			desc = [line.strip() for line in desc if line.strip()]
-			# We need to word wrap the description to 1 less than the terminal width, or else we will occasionally see blank lines in the description.
-			print self.filterAnsi(textwrap.fill(" ".join(desc), self.width-1))
-		for line in self.filterAnsi(getattr(self.room, "dynamicDesc", "")).splitlines():
-			if line:
-				print textwrap.fill(line, self.width-1)
-		#loop through the list of exits in the current room, and build the doors/exits lines.
-		doorList = []
-		exitList = []
-		for item in getattr(self.room, "exits", []):
-			direction = item.dir
-			to = item.to
-			door = item.door
-			doorFlags = getattr(item, "doorFlags", ())
-			# If there is a door in that direction
-			if door:
-				doorList.append("%s: %s" % (direction, door))
-				# Doors with a name of 'exit' are not hidden exits in Mume. The actual door name in the game could be anything.
-				if door == "exit" or "hidden" not in doorFlags:
-					# Now that the direction has been added to the doors list, we will enclose it in parentheses '()' for use in the exits line. In Mume, enclosing an exits line direction in parentheses denotes an opened door in that direction.
-					direction = "(%s)" % direction
-				else:
-					# The door is a secret exit.
-					# Now that the direction and door names have been added to the doors list, we will enclose the direction in brackets '[]' for use in the exits line. In Mume, enclosing an exits line direction in brackets denotes a closed door in that direction.
-					direction = "[%s]" % direction
-			# The next 2 are just convenience symbols for denoting if the exit is to an undefined room or a known deathtrap.  They aren't used in Mume. The '=' signs are used in Mume to denote that the room in that direction is a road though.
-			if to == "DEATH":
-				direction = "!!%s!!" % direction
-			elif to not in self.rooms or to=="UNDEFINED":
-				direction = "??%s??" % direction
-			elif getattr(self.rooms[to], "terrain") == "ROAD":
-				direction = "=%s=" % direction
-			# Now that we are done manipulating the direction string, we'll add it to the exits list.
-			exitList.append(direction)
-		# If any of the exits had a door, print the direction and name of the door if applicable.
-		if doorList:
-			print "Doors:"
-			print ",\n".join(doorList)
-		# print the exits line
-		if not exitList:
-			exitList.append("None!")
-		print "Exits: %s" % ", ".join(exitList)
-		note = getattr(self.room, "note", "").strip()
-		if note:
-			print "Note: %s" % self.filterAnsi(note)
-		# If the user has enabled the showing of room IDs in the configuration, print the room ID.
-		if self.config.get("show_id"):
-			print "ID: %s" % getattr(self.room, "id", "NONE")
-
-	def longExits(self):
-		"""The exits command"""
-		print "Exits:"
-		roomExits = getattr(self.room, "exits", [])
-		if not roomExits:
-			print "None!"
-			return
-		for item in roomExits:
-			exitLine = []
-			exitLine.append("%s:" % item.dir.capitalize())
-			door = item.door
-			doorFlags = getattr(item, "doorFlags", ())
-			if door:
-				exitLine.append("%s (%s)," % ("visible" if door=="exit" or "hidden" not in doorFlags else "hidden", door))
-			to = item.to
-			if to.isdigit() and to in self.rooms:
-				exitLine.append("%s, %s" % (self.filterAnsi(getattr(self.rooms[to], "name", "")), getattr(self.rooms[to], "terrain", "")))
-			else:
-				exitLine.append("UNDEFINED" if to!="DEATH" else to)
-			print " ".join(exitLine)
-
-	def setRoom(self, roomID):
-		"""Sets the reference to the current room to the room object with roomID"""
-		# UNDEFINED and DEATH aren't actual rooms in the database, they are just attributes of an exit.  We will therefore return "UNDEFINED" or "DEATH"
-		if roomID=="UNDEFINED" or roomID=="DEATH":
-			return roomID
-		elif roomID not in self.rooms:
-			return "UNDEFINED"
-		self.room = self.rooms[roomID]
-		self.config["last_id"] = roomID
-
-	def toggleSetting(self, setting):
-		"""This function handles configuration settings that can be toggled True/False"""
-		# Toggle the value and return the new state
-		self.config[setting] = self.config.get(setting, True) == False
-		return self.config[setting]
-
-	def saveConfig(self):
-		"""Saves the configuration to disk"""
-		with open(self.configFile, "wb") as data:
-			json.dump(self.config, data, sort_keys=True, indent=2, separators=(",", ": "), encoding="UTF-8")
-
-	def createSpeedWalk(self, directionsList):
-		output = []
-		for key, value in itertools.groupby(directionsList):
-			lenValue = len(list(value))
-			if lenValue == 1:
-				output.append(key[0])
-			else:
-				output.append("{0}{1}".format(lenValue, key[0]))
-		return "".join(output)
-
-	def pathFind(self, origin=None, destination=None):
-		"""Find the path"""
-		if not origin or not destination:
-			return "Error: Invalid origin or destination."
-		elif origin == destination:
-			return "You are already there!"
-		# Each key-value pare that gets added to this dict will be a parent room and child room respectively.
-		parents = {origin: origin}
-		# unprocessed rooms.
-		opened = []
-		# Using a binary heap for storing unvisited rooms significantly increases performance.
-		# https://en.wikipedia.org/wiki/Binary_heap
-		heapq.heapify(opened)
-		# Put the origin cost and origin room on the opened rooms heap to be processed first.
-		heapq.heappush(opened, (origin.cost, origin))
-		# previously processed rooms.
-		closed = {}
-		# Ignore the origin from the search by adding it to the closed rooms dict.
-		closed[origin] = origin.cost
-		# Search while there are rooms left in the opened heap.
-		while opened:
-			# Pop the last room cost and room object reference off the opened heap for processing.
-			currentRoomCost, currentRoomObj = heapq.heappop(opened)
-			if currentRoomObj == destination:
-					# We successfully found a path from the origin to the destination.
-					pathDirections = []
-					# find the path from the origin to the destination by traversing the rooms that we passed through to get here.
-					while currentRoomObj != origin:
-						# Loop through the exits of the parent room, and find which exit links to the current room.
-						for roomObj in parents[currentRoomObj].exits:
-							if roomObj.to == currentRoomObj.id:
-								# Insert the direction name at the beginning of the pathDirections list.
-								pathDirections.insert(0, roomObj.dir)
-								break
-						# The parent room becomes the current room, and we repeat until all the parent rooms have been traversed.
-						currentRoomObj = parents[currentRoomObj]
-					# Return the directions in a standard speed walk format.
-					return self.createSpeedWalk(pathDirections)
-			# If we're here, the current room isn't the destination.
-			# Loop through the exits, and process each room linked to the current room.
-			for exitObj in currentRoomObj.exits:
-				# Ignore exits that link to undefined or death trap rooms.
-				if exitObj.to=="UNDEFINED" or exitObj.to=="DEATH" or exitObj.to not in self.rooms:
-					continue
-				# Get a reference to the room object that the exit leads to using the room's unique ID number.
-				neighborRoomObj = self.rooms[exitObj.to]
-				# The neighbor room cost should be the sum of all movement costs to get to the neighbor room from the origin room.
-				neighborRoomCost = currentRoomCost + neighborRoomObj.cost
-				# We're only interested in the neighbor room if it hasn't been encountered yet, or if the cost of moving from the current room to the neighbor room is less than the cost of moving to the neighbor room from a previously discovered room.
-				if neighborRoomObj not in closed or closed[neighborRoomObj] > neighborRoomCost:
-					# Add the room object and room cost to the dict of closed rooms, and put it on the opened rooms heap to be processed.
-					closed[neighborRoomObj] = neighborRoomCost
-					heapq.heappush(opened, (neighborRoomCost, neighborRoomObj))
-					# Since the current room is so far the most optimal way into the neighbor room, set it as the parent of the neighbor room.
-					parents[neighborRoomObj] = currentRoomObj
-		# If we have made it this far, we've exhausted are search of all the connected rooms without finding the destination.
-		return "No routes found."
-
-	def labelRoom(self, label, target):
-		"""Maps a 1-word, alphanumeric label to a room ID"""
-		if target == "none":
-			# If the target is 'none', delete the label if defined.
-			try:
-				self.config["labels"].pop(label)
-			except KeyError:
-				return "Error: No label with that name exists."
-			self.saveConfig()
-			return "Label %s removed." % label
-		elif target in self.rooms:
-			# create the label and save the configuration to disk
-			self.config["labels"][label] = target
-			self.saveConfig()
-			return "label %s added for room ID %s." % (label, target)
-		else:
-			# The target wasn't a valid room ID in self.rooms
-			return "Error: invalid room ID."
-
-	def parseInput(self, line):
-		"""Parses the user's input, and executes the appropriate command"""
-		#split the line into words.
-		args = line.split()
-		# The first word is the command, and the rest of the words are possible arguments, so pop the first word from the list.
-		command = args.pop(0)
-		if command.isdigit():
-			# User has typed in a possible room ID.  Move to the room with that ID if possible.
-			status = self.setRoom(command)
-			if status == "UNDEFINED":
-				print "Invalid room ID."
-			else:
-				self.look()
-		elif [x for x in getattr(self.room, "exits", []) if getattr(x, "dir", "UNDEFINED").startswith(command)]:
-			# The user has typed in one of the exits from the current room's list of valid exits. Loop through the list of valid exits until we find the desired exit, and move to it.
-			for item in getattr(self.room, "exits", []):
-				if getattr(item, "dir", "UNDEFINED").startswith(command):
-					status = self.setRoom(getattr(item, "to", "UNDEFINED"))
-					if status == "UNDEFINED":
-						print "Undefined room in that direction."
-					elif status == "DEATH":
-						print "Death trap in that direction."
-					else:
-						self.look()
-					break
-		elif "look".startswith(command):
-			self.look()
-		elif "id".startswith(command):
-			status = self.toggleSetting("show_id")
-			print "Show room ID %s." % ("enabled" if status else "disabled")
-		elif "brief".startswith(command):
-			status = self.toggleSetting("brief")
-			print "Brief mode %s." % ("enabled" if status else "disabled")
-		elif "terrain".startswith(command):
-			status = self.toggleSetting("use_terrain_symbols")
-			print "Terrain symbols in prompt %s." % ("enabled" if status else "disabled")
-		elif command!="e" and "exits".startswith(command):
-			self.longExits()
-		elif "path".startswith(command):
-			# This command takes 1 or 2 arguments
-			if len(args) in [1, 2]:
-				if args[-1] in self.config["labels"]:
-					# The argument was a valid room label. Set the destination to the room object that has the ID in label.
-					destination = self.rooms.get(self.config["labels"][args.pop()])
-				else:
-					# argument is a possible room ID. Try to set the destination to the room object with that ID.
-					destination = self.rooms.get(args.pop())
-				if not args:
-					# An origin wasn't defined, so use the current room.
-					origin = self.room
-				elif args[0] in self.config["labels"]:
-					# The argument was a valid room label. Set the origin to the room object that has the ID in label.
-					origin = self.rooms.get(self.config["labels"][args.pop()])
-				else:
-					# argument is a possible room ID. Try to set the origin to the room object with that ID.
-					origin = self.rooms.get(args.pop())
-				print self.pathFind(origin, destination)
-			else:
-				print "Usage: path [origin] destination"
-				print "Origin will default to the current room if not provided."
-		elif "label".startswith(command):
-			# This command takes 1 or 2 arguments
-			if len(args) in [1, 2]:
-				# The label is the first argument, the targeted room is the second if defined.
-				label = args.pop(0)
-				if label == "list":
-					# print a sorted list of currently defined room labels.
-					labelsList = ["%s: %s"%(key, value) for key, value in self.config["labels"].items()]
-					labelsList.sort()
-					labelsList.insert(0, "labels list:" if labelsList else "No labels defined yet.")
-					self.page(labelsList)
-				else:
-					# If there is a second argument, apply the label to the room with that ID. Else, apply it to the current room.
-					target = self.room.id if not args else args.pop()
-					print self.labelRoom(label, target)
-			else:
-				print "Usage: label [list|[name [room_ID]"
-				print "If room_ID is 'none', the label will be removed."
-				print "Room_ID will default to the current room ID if not provided."
-		elif command in self.config["labels"]:
-			# The command was a valid room label.  Move to that room.
-			self.setRoom(self.config["labels"][command])
-			self.look()
-		else:
-			print "Invalid command or direction!"
-
-
-def main():
-	parser = argparse.ArgumentParser(description="Allows you to virtually explore the Mume world.")
-	parser.add_argument("-c", "--config", help="the configuration file")
-	group = parser.add_mutually_exclusive_group()
-	group.add_argument("-m", "--mmapper", help="database is in MMapper 2 format", action="store_true")
-	group.add_argument("-p", "--pandora", help="database is in Pandora Mapper format", action="store_true")
-	parser.add_argument("databaseFile")
-	args = parser.parse_args()
-	if not args.config:
-		print "You need to specify a configuration file."
-		return
-	if args.mmapper:
-		DBClass = mmapper.Database
-	elif args.pandora:
-		DBClass = pandora.Database
-	print "Welcome to Mume Map Emulation!"
-	print "Loading the world database."
-	world = World(configFile=args.config, DBClass=DBClass, databaseFile=args.databaseFile)
-	print "Loaded %s rooms." % str(len(world.rooms))
-	world.look()
-	while True:
-		# Indicate the current room's terrain in the prompt according to the setting of use_terrain_symbols in the configuration.
-		prompt = "%s> " % (getattr(world.room, "terrainSymbol", "") if world.config.get("use_terrain_symbols") else getattr(world.room, "terrain", "UNDEFINED"))
-		line = raw_input(prompt).strip().lower()
-		if line:
-			if "quit".startswith(line):
-				# Break out of the loop, save the configuration to disk, and exit the program
-				break
-			world.parseInput(line)
-	world.saveConfig()
-	print "Good bye."
-
-
-if __name__ == "__main__":
-	main()
+﻿#!/usr/bin/env python2
+
+import argparse
+import codecs
+import collections
+import functools
+import heapq
+import itertools
+import json
+import os
+import re
+import signal
+import sys
+import textwrap
+import threading
+import time
+import timeit
+
+import altroutes
+import incremental
+import memstats
+import mmapper
+import pager
+import pandora
+import regions
+from rooms import buildReverseExits, doorflags, hasOpenExit, roomCost, roomFields
+import terminalsize
+import visited
+
+ANSI_COLOR_REGEXP = re.compile(ur"[\n]?\x1b\[[0-9;]+[m][\n]?")
+# A speed walk, such as '3n2ew', is a sequence of directions, each optionally preceded by a repeat count.
+SPEEDWALK_REGEX = re.compile(r"^(?:\d*[nsewud])+$")
+SPEEDWALK_STEP_REGEX = re.compile(r"(\d*)([nsewud])")
+SPEEDWALK_DIRECTIONS = {"n": "north", "s": "south", "e": "east", "w": "west", "u": "up", "d": "down"}
+DOOR_FLAG_HIDDEN = doorflags.map_by_name["hidden"]
+# The maximum number of rooms to keep the rendered output of.
+RENDER_CACHE_SIZE = 1024
+# The size of the output buffer used in batch mode.
+BATCH_BUFFER_SIZE = 65536
+# The number of seconds between checks for changes to the database file when watching it.
+DATABASE_POLL_INTERVAL = 2.0
+# The number of rooms the background path search settles before giving the user's commands a chance to run.
+PATH_TREE_SLICE = 256
+# The number of seconds the background path search sleeps between slices.
+PATH_TREE_PAUSE = 0.001
+# Route costs are sums of floating point numbers, which may differ in the last digits depending on the order they were added in.
+COST_TOLERANCE = 1e-6
+
+
+class PathTree(object):
+	"""The cheapest routes from an origin room, built incrementally by advancing a search"""
+
+	def __init__(self, origin, parents, search):
+		self.origin = origin
+		# Maps every room reached so far to the room it was reached from.
+		self.parents = parents
+		# Maps the rooms whose cheapest route is known to the cost of that route.
+		self.settled = {}
+		self.search = search
+		self.complete = False
+
+	def advance(self, count):
+		"""Settles up to count more rooms, and returns False if every reachable room has been settled"""
+		settledCount = 0
+		for cost, room in itertools.islice(self.search, count):
+			# A room may come off the heap again with a higher cost, but only the first time counts.
+			self.settled.setdefault(room, cost)
+			settledCount += 1
+		if settledCount < count:
+			self.complete = True
+		return not self.complete
+
+	def find(self, destination):
+		"""Advances the search until destination is settled, and returns True if it is reachable"""
+		while destination not in self.settled and self.advance(1):
+			pass
+		return destination in self.settled
+
+
+class World(object):
+	"""The main world class"""
+
+	def __init__(self, **kwargs):
+		# The file object that command output is written to.
+		self.out = kwargs.get("output", sys.stdout)
+		# If False, long output is streamed directly instead of being shown one screen at a time.
+		self.usePager = kwargs.get("usePager", True)
+		# The output of the look command for recently displayed rooms.
+		self.renderCache = collections.OrderedDict()
+		# Set by the SIGWINCH handler. The handler can interrupt the main thread anywhere, including in the middle of changing the render cache, so it only sets this flag, and the new size is read before the next output is rendered.
+		self.resized = False
+		self.resize(kwargs.get("width"), kwargs.get("height"))
+		self.configFile = kwargs.get("configFile")
+		if "config" in kwargs:
+			# The configuration was given directly. It will not be saved to disk.
+			self.config = kwargs["config"]
+		else:
+			# Load the configuration file.
+			with open(self.configFile, "rb") as data:
+				self.config = json.load(data, encoding="UTF-8")
+		# Set up the labels dict inside the configuration if it isn't there.
+		if "labels" not in self.config:
+			self.config["labels"] = {}
+		# Bidirectional and hierarchical path search are off unless the user turns them on.
+		self.config.setdefault("bidirectional_search", False)
+		self.config.setdefault("hierarchical_search", False)
+		# The IDs of the rooms that the user has been to are kept in a bitmap, saved in a file next to the configuration file.
+		self.visited = visited.RoomBitmap()
+		self.visitedFile = self.configFile + ".visited" if self.configFile else None
+		if self.visitedFile:
+			self.visited.load(self.visitedFile)
+		# The rooms in each region and terrain type, used by the coverage command.
+		self.coverageGroups = None
+		# The reverse exits, built by getReverseExits when a backward search first needs them.
+		self.reverseExits = None
+		# Finds routes between the portal rooms of regions, for hierarchical path search.
+		self.regionRouter = None
+		# The IDs of rooms that routes can't enter, (room ID, direction) tuples of exits that routes can't take, and room costs that have been changed, mapping room IDs to costs.
+		# These only last until the program exits. They belong to this World, so with the server each session has its own, even though the sessions share the room objects.
+		self.blockedRooms = set()
+		self.blockedExits = set()
+		self.costOverrides = {}
+		# Repairs the route to the most recent destination when rooms or exits are blocked, rather than searching from scratch.
+		self.incrementalRouter = None
+		self.loadTrace = []
+		self.DBClass = kwargs.get("DBClass")
+		self.databaseFile = kwargs.get("databaseFile")
+		# Commands hold this lock while they run, so that the rooms dict isn't modified by a reload in the middle of a command.
+		self.lock = threading.RLock()
+		# loaded is set when every room has been loaded. ready is set when the starting room and its neighbors have been loaded.
+		self.loaded = threading.Event()
+		self.ready = threading.Event()
+		# The most recent path tree, and the room that the background path search should start from next.
+		self.pathTree = None
+		self.pathTreeOrigin = None
+		self.pathTreeCondition = None
+		self.pathTreeStopped = False
+		self.room = None
+		if "rooms" in kwargs:
+			# Share a rooms dict that has already been loaded, rather than loading the database again.
+			self.rooms = kwargs["rooms"]
+			self.database = kwargs.get("database")
+			self.loaded.set()
+			self.ready.set()
+		elif kwargs.get("progressive"):
+			# Load the rooms on a background thread, and continue as soon as the starting room can be displayed.
+			self.rooms = {}
+			self.database = None
+			self.loadedIDs = set()
+			self.pendingIDs = None
+			thread = threading.Thread(target=self.loadDatabase)
+			thread.daemon = True
+			thread.start()
+			self.ready.wait()
+		else:
+			if kwargs.get("traceMemory") or kwargs.get("snapshotFile"):
+				# Load the database with tracemalloc enabled, keeping the report for the memstats command.
+				database, self.loadTrace = memstats.traceLoad(self.DBClass, self.databaseFile, kwargs.get("snapshotFile"))
+			else:
+				database = self.DBClass(self.databaseFile)
+			self.rooms = database.rooms
+			self.database = database
+			self.loaded.set()
+			self.ready.set()
+		# Set the initial room to the room that the user was in when the program last terminated.
+		lastID = self.config.get("last_id")
+		if lastID not in self.rooms:
+			self.loaded.wait()
+			lastID = min(self.rooms)
+		self.room = self.rooms[lastID]
+		self.visited.add(lastID)
+		self.buildCommandTable()
+		if kwargs.get("speculate"):
+			self.startPathTrees()
+
+	def loadDatabase(self):
+		"""Loads the database into self.rooms. This runs on a background thread when loading progressively"""
+		try:
+			self.database = self.DBClass(self.databaseFile, rooms=self.rooms, roomLoaded=self.roomLoaded)
+		finally:
+			# The user only needs to be told that loading has finished if the prompt was shown before it finished.
+			announce = self.ready.is_set()
+			self.loaded.set()
+			self.ready.set()
+			self.loadedIDs = None
+		with self.lock:
+			# Rooms rendered while loading weren't cached, but clear the cache anyway in case exits to death traps were rendered after loading finished.
+			self.renderCache.clear()
+			if announce:
+				print >> self.out, "\nFinished loading %d rooms." % len(self.rooms)
+				self.out.write(self.prompt())
+				self.out.flush()
+
+	def roomLoaded(self, room):
+		"""Called by the database for each room it loads, to signal when the starting room and its neighbors are available"""
+		if self.ready.is_set():
+			return
+		self.loadedIDs.add(room.id)
+		if self.pendingIDs is None:
+			if room.id == self.config.get("last_id") and room.id in self.rooms:
+				# The IDs of the neighboring rooms that haven't been loaded yet.
+				self.pendingIDs = set(exitObj.to for exitObj in room.exits if exitObj.to.isdigit() and exitObj.to not in self.loadedIDs)
+			else:
+				return
+		else:
+			self.pendingIDs.discard(room.id)
+		if not self.pendingIDs:
+			self.ready.set()
+
+	def waitUntilLoaded(self):
+		"""Blocks until every room in the database has been loaded"""
+		if not self.loaded.is_set():
+			print >> self.out, "Waiting for the world database to finish loading."
+			self.out.flush()
+			self.loaded.wait()
+
+	def waitForRoom(self, roomID):
+		"""Returns True if roomID is a loaded room, waiting for the database to finish loading if the room hasn't been loaded yet"""
+		if roomID not in self.rooms and roomID.isdigit():
+			self.waitUntilLoaded()
+		return roomID in self.rooms
+
+	def filterAnsi(self, text):
+		return ANSI_COLOR_REGEXP.sub('', text)
+
+	def page(self, lines):
+		"""Shows the lines from a list or generator one screen at a time, or streams them if output isn't going to a terminal"""
+		self.applyResize()
+		isatty = getattr(self.out, "isatty", None)
+		if self.usePager and isatty is not None and isatty():
+			pager.pageLines(lines, self.out, self.height)
+		else:
+			pager.streamLines(lines, self.out)
+
+	def look(self):
+		"""What to do when the user types 'look', enters a new room, ETC"""
+		self.applyResize()
+		key = (self.room.id, self.width, bool(self.config.get("brief")), bool(self.config.get("show_id")))
+		try:
+			# Move the cached output to the end of the ordered dict, marking it as the most recently used.
+			text = self.renderCache.pop(key)
+		except KeyError:
+			text = self.renderRoom(self.room)
+			if len(self.renderCache) >= RENDER_CACHE_SIZE:
+				# Discard the least recently used room.
+				self.renderCache.popitem(last=False)
+		# The exits line may refer to rooms that haven't been loaded yet, so the output is only cached once loading has finished.
+		if self.loaded.is_set():
+			self.renderCache[key] = text
+		print >> self.out, text
+
+	def getRoom(self, roomID):
+		"""Returns the room object with roomID, raising ValueError if there isn't one"""
+		room = self.rooms.get(roomID)
+		if room is None:
+			raise ValueError("Invalid room ID: %s" % roomID)
+		return room
+
+	def describe(self, roomID):
+		"""
+		Returns a dict describing the room with roomID, for programs using the world without the command line.
+		The text is as stored in the database, without word wrapping or filtering of ANSI color codes, except that the description is split into a list of lines with the blank lines removed.
+		"""
+		with self.lock:
+			room = self.getRoom(roomID)
+			# In Pandora databases, The description text uses '|' (bar) as an end of line character.
+			desc = getattr(room, "desc", "").replace("|", "\n").splitlines()
+			result = {
+				"id": room.id,
+				"name": getattr(room, "name", ""),
+				"desc": [line.strip() for line in desc if line.strip()],
+				"dynamicDesc": [line for line in getattr(room, "dynamicDesc", "").splitlines() if line],
+				"terrain": getattr(room, "terrain", "UNDEFINED"),
+				"note": (getattr(room, "note", "") or "").strip(),
+				"exits": self.exits(roomID),
+				"marks": []}
+			# Only MMapper databases have info marks.
+			if hasattr(self.database, "marksAt"):
+				for mark in self.database.marksAt(room):
+					timeStamp = mark.time_stamp
+					result["marks"].append({"class": mark.cls, "type": mark.type, "date": timeStamp.date() if timeStamp else None, "text": mark.text or mark.name})
+			return result
+
+	def exits(self, roomID):
+		"""
+		Returns a list of dicts describing the exits of the room with roomID.
+		The name and terrain of the room that an exit leads to are None if the room isn't known, or hasn't been loaded yet.
+		"""
+		with self.lock:
+			result = []
+			for item in getattr(self.getRoom(roomID), "exits", []):
+				target = self.rooms.get(item.to)
+				result.append({
+					"dir": item.dir,
+					"to": item.to,
+					"door": item.door,
+					# Doors with a name of 'exit' are not hidden exits in Mume. The actual door name in the game could be anything.
+					"hidden": bool(item.door and item.door != "exit" and item.doorFlagBits & DOOR_FLAG_HIDDEN),
+					"blocked": (roomID, item.dir) in self.blockedExits or item.to in self.blockedRooms,
+					"name": getattr(target, "name", "") if target is not None else None,
+					"terrain": getattr(target, "terrain", "") if target is not None else None})
+			return result
+
+	def move(self, direction):
+		"""
+		Moves through the exit of the current room matching direction, which can be an abbreviation.
+		Returns a dict containing the status, which is 'moved', 'undefined', 'death', or 'invalid' if there is no such exit, and the ID of the current room afterward.
+		"""
+		with self.lock:
+			exitObj = self.room.directionPrefixes().get(direction)
+			if exitObj is None:
+				status = "invalid"
+			else:
+				status = self.setRoom(getattr(exitObj, "to", "UNDEFINED"))
+				status = "moved" if status is None else status.lower()
+			return {"status": status, "room": self.room.id}
+
+	def route(self, originID, destinationID):
+		"""
+		Returns a dict describing the cheapest route from the room with originID to the room with destinationID, or None if there isn't a route.
+		The dict contains the list of direction names, the same route as a speed walk, and the cost of the rooms entered along the way.
+		"""
+		# Routes can lead anywhere, so every room needs to be loaded.
+		self.loaded.wait()
+		with self.lock:
+			origin = self.getRoom(originID)
+			destination = self.getRoom(destinationID)
+			pathDirections = [] if origin is destination else self.findDirections(origin, destination)
+			if pathDirections is None:
+				return None
+			cost = 0.0
+			room = origin
+			for direction in pathDirections:
+				room = self.rooms[room.directionPrefixes()[direction].to]
+				cost += roomCost(room, self.costOverrides)
+			return {"origin": origin.id, "destination": destination.id, "directions": pathDirections, "speedWalk": self.createSpeedWalk(pathDirections), "cost": cost}
+
+	def routes(self, originID, destinationID, count):
+		"""Returns a list of dicts like those returned by route, describing up to count of the cheapest routes without loops from the room with originID to the room with destinationID, cheapest first"""
+		self.loaded.wait()
+		with self.lock:
+			origin = self.getRoom(originID)
+			destination = self.getRoom(destinationID)
+			if origin is destination:
+				return [{"origin": origin.id, "destination": destination.id, "directions": [], "speedWalk": "", "cost": 0.0}]
+			found = altroutes.findRoutes(self.rooms, self.getReverseExits(), origin, destination, count, self.blockedRooms, self.blockedExits, self.costOverrides)
+			return [{"origin": origin.id, "destination": destination.id, "directions": item.directions, "speedWalk": self.createSpeedWalk(item.directions), "cost": item.cost} for item in found]
+
+	def hasClosures(self):
+		"""Returns True if any rooms or exits are blocked, or any room costs have been changed"""
+		return bool(self.blockedRooms or self.blockedExits or self.costOverrides)
+
+	def closuresChanged(self, room, entry):
+		"""
+		Updates the routing state after the exits of room were blocked or unblocked, or if entry is True, after room itself was blocked or unblocked or its cost changed.
+		The incremental router repairs its costs, and the path tree and the regions around room are worked out again when needed.
+		"""
+		self.pathTree = None
+		if self.regionRouter is not None:
+			self.regionRouter.roomsChanged([room], [room])
+		if self.incrementalRouter is not None:
+			if entry:
+				self.incrementalRouter.entryChanged(room)
+			else:
+				self.incrementalRouter.exitsChanged(room)
+		self.requestPathTree(self.room)
+
+	def findExit(self, room, direction):
+		"""Returns the exit of room matching direction, which can be an abbreviation, raising ValueError if there isn't one"""
+		exitObj = room.directionPrefixes().get(direction)
+		if exitObj is None:
+			raise ValueError("No exit leading %s from room %s." % (direction, room.id))
+		return exitObj
+
+	def blockExit(self, roomID, direction):
+		"""Stops routes from taking the exit of the room with roomID matching direction. Returns the direction name, or None if the exit was already blocked"""
+		with self.lock:
+			room = self.getRoom(roomID)
+			key = (room.id, self.findExit(room, direction).dir)
+			if key in self.blockedExits:
+				return None
+			self.blockedExits.add(key)
+			self.closuresChanged(room, False)
+			return key[1]
+
+	def unblockExit(self, roomID, direction):
+		"""Lets routes take a blocked exit again. Returns the direction name, or None if the exit wasn't blocked"""
+		with self.lock:
+			room = self.getRoom(roomID)
+			key = (room.id, self.findExit(room, direction).dir)
+			if key not in self.blockedExits:
+				return None
+			self.blockedExits.discard(key)
+			self.closuresChanged(room, False)
+			return key[1]
+
+	def blockRoom(self, roomID):
+		"""Stops routes from entering the room with roomID. Returns False if it was already blocked"""
+		with self.lock:
+			room = self.getRoom(roomID)
+			if room.id in self.blockedRooms:
+				return False
+			self.blockedRooms.add(room.id)
+			self.closuresChanged(room, True)
+			return True
+
+	def unblockRoom(self, roomID):
+		"""Lets routes enter a blocked room again. Returns False if it wasn't blocked"""
+		with self.lock:
+			room = self.getRoom(roomID)
+			if room.id not in self.blockedRooms:
+				return False
+			self.blockedRooms.discard(room.id)
+			self.closuresChanged(room, True)
+			return True
+
+	def setRoomCost(self, roomID, cost):
+		"""Changes the cost of entering the room with roomID, or resets it to the cost of its terrain if cost is None. Returns the new cost"""
+		with self.lock:
+			room = self.getRoom(roomID)
+			if cost is None:
+				self.costOverrides.pop(room.id, None)
+			else:
+				try:
+					value = float(cost)
+				except ValueError:
+					value = None
+				# The route searches need costs to be positive.
+				if value is None or not value > 0 or value == float("inf"):
+					raise ValueError("Invalid cost: %s" % cost)
+				# The room objects may be shared with other sessions, so the new cost is only kept here, and looked up by the route searches.
+				self.costOverrides[room.id] = value
+			self.closuresChanged(room, True)
+			return roomCost(room, self.costOverrides)
+
+	def closures(self):
+		"""Returns a dict containing sorted lists of the blocked room IDs and the blocked exits as (room ID, direction) tuples, and the dict of changed room costs"""
+		with self.lock:
+			return {"rooms": sorted(self.blockedRooms, key=lambda roomID: (len(roomID), roomID)), "exits": sorted(self.blockedExits, key=lambda item: (len(item[0]), item)), "costs": dict(self.costOverrides)}
+
+	def renderRoom(self, room):
+		"""Returns the output of the look command for a room, word wrapped to the terminal width"""
+		info = self.describe(room.id)
+		lines = []
+		lines.append(self.filterAnsi(info["name"]))
+		# If brief mode is disabled
+		if not self.config.get("brief"):
+			# We need to word wrap the description to 1 less than the terminal width, or else we will occasionally see blank lines in the description.
+			lines.append(self.filterAnsi(textwrap.fill(" ".join(info["desc"]), self.width-1)))
+		for line in info["dynamicDesc"]:
+			line = self.filterAnsi(line)
+			if line:
+				lines.append(textwrap.fill(line, self.width-1))
+		#loop through the list of exits in the room, and build the doors/exits lines.
+		doorList = []
+		exitList = []
+		for item in info["exits"]:
+			direction = item["dir"]
+			# If there is a door in that direction
+			if item["door"]:
+				doorList.append("%s: %s" % (direction, item["door"]))
+				if not item["hidden"]:
+					# Now that the direction has been added to the doors list, we will enclose it in parentheses '()' for use in the exits line. In Mume, enclosing an exits line direction in parentheses denotes an opened door in that direction.
+					direction = "(%s)" % direction
+				else:
+					# The door is a secret exit.
+					# Now that the direction and door names have been added to the doors list, we will enclose the direction in brackets '[]' for use in the exits line. In Mume, enclosing an exits line direction in brackets denotes a closed door in that direction.
+					direction = "[%s]" % direction
+			# The next 2 are just convenience symbols for denoting if the exit is to an undefined room or a known deathtrap.  They aren't used in Mume. The '=' signs are used in Mume to denote that the room in that direction is a road though.
+			if item["to"] == "DEATH":
+				direction = "!!%s!!" % direction
+			elif item["terrain"] is None:
+				direction = "??%s??" % direction
+			elif item["terrain"] == "ROAD":
+				direction = "=%s=" % direction
+			# Now that we are done manipulating the direction string, we'll add it to the exits list.
+			exitList.append(direction)
+		# If any of the exits had a door, add the direction and name of the door if applicable.
+		if doorList:
+			lines.append("Doors:")
+			lines.append(",\n".join(doorList))
+		# Add the exits line
+		if not exitList:
+			exitList.append("None!")
+		lines.append("Exits: %s" % ", ".join(exitList))
+		if info["note"]:
+			lines.append("Note: %s" % self.filterAnsi(info["note"]))
+		for mark in info["marks"]:
+			lines.append("Mark (%s %s%s): %s" % (mark["class"], mark["type"], ", %s" % mark["date"] if mark["date"] else "", self.filterAnsi(mark["text"])))
+		# If the user has enabled the showing of room IDs in the configuration, add the room ID.
+		if self.config.get("show_id"):
+			lines.append("ID: %s" % info["id"])
+		return "\n".join(lines)
+
+	def resize(self, width=None, height=None):
+		"""Updates the terminal dimensions, discarding any output that was word wrapped to the previous width"""
+		if width is None or height is None:
+			width, height = terminalsize.get_terminal_size()
+		self.width, self.height = width, height
+		self.renderCache.clear()
+
+	def applyResize(self):
+		"""Reads the new terminal dimensions if the terminal window has been resized since output was last rendered"""
+		if self.resized:
+			with self.lock:
+				self.resized = False
+				self.resize()
+
+	def longExits(self):
+		"""The exits command"""
+		print >> self.out, "Exits:"
+		roomExits = getattr(self.room, "exits", [])
+		if not roomExits:
+			print >> self.out, "None!"
+			return
+		for item in roomExits:
+			if item.to.isdigit():
+				self.waitForRoom(item.to)
+		for item in self.exits(self.room.id):
+			exitLine = []
+			exitLine.append("%s:" % item["dir"].capitalize())
+			if item["door"]:
+				exitLine.append("%s (%s)," % ("hidden" if item["hidden"] else "visible", item["door"]))
+			if item["to"].isdigit() and item["name"] is not None:
+				exitLine.append("%s, %s" % (self.filterAnsi(item["name"]), item["terrain"]))
+			else:
+				exitLine.append("UNDEFINED" if item["to"]!="DEATH" else item["to"])
+			if item["blocked"]:
+				exitLine.append("(blocked)")
+			print >> self.out, " ".join(exitLine)
+
+	def prompt(self):
+		"""Returns the prompt, indicating the current room's terrain according to the setting of use_terrain_symbols in the configuration"""
+		return "%s> " % (getattr(self.room, "terrainSymbol", "") if self.config.get("use_terrain_symbols") else getattr(self.room, "terrain", "UNDEFINED"))
+
+	def memoryStats(self):
+		"""Returns a list of lines describing the memory used by the loaded world"""
+		lines = memstats.formatWorldMemory(memstats.worldMemory(self.rooms))
+		if getattr(self.database, "textPool", None) is not None:
+			lines.extend(memstats.formatTextPool(self.database.textPool))
+		return lines + self.loadTrace
+
+	def setRoom(self, roomID):
+		"""Sets the reference to the current room to the room object with roomID"""
+		# UNDEFINED and DEATH aren't actual rooms in the database, they are just attributes of an exit.  We will therefore return "UNDEFINED" or "DEATH"
+		if roomID=="UNDEFINED" or roomID=="DEATH":
+			return roomID
+		elif not self.waitForRoom(roomID):
+			return "UNDEFINED"
+		self.room = self.rooms[roomID]
+		self.config["last_id"] = roomID
+		self.visited.add(roomID)
+		self.requestPathTree(self.room)
+
+	def toggleSetting(self, setting):
+		"""This function handles configuration settings that can be toggled True/False"""
+		# Toggle the value and return the new state
+		self.config[setting] = self.config.get(setting, True) == False
+		# The rendered room output depends on some of the settings.
+		self.renderCache.clear()
+		return self.config[setting]
+
+	def saveConfig(self):
+		"""Saves the configuration to disk"""
+		if not self.configFile:
+			return
+		with open(self.configFile, "wb") as data:
+			json.dump(self.config, data, sort_keys=True, indent=2, separators=(",", ": "), encoding="UTF-8")
+		self.visited.save(self.visitedFile)
+
+	def createSpeedWalk(self, directionsList):
+		output = []
+		for key, value in itertools.groupby(directionsList):
+			lenValue = len(list(value))
+			if lenValue == 1:
+				output.append(key[0])
+			else:
+				output.append("{0}{1}".format(lenValue, key[0]))
+		return "".join(output)
+
+	def pathFind(self, origin=None, destination=None):
+		"""Find the path"""
+		if not origin or not destination:
+			return "Error: Invalid origin or destination."
+		elif origin == destination:
+			return "You are already there!"
+		result = self.route(origin.id, destination.id)
+		if result is None:
+			return "No routes found."
+		# Return the directions in a standard speed walk format.
+		return result["speedWalk"]
+
+	def findDirections(self, origin, destination):
+		"""Returns a list of the direction names leading from origin to destination along the cheapest route, or None if there isn't a route"""
+		with self.lock:
+			if destination.id in self.blockedRooms and origin is not destination:
+				return None
+			tree = self.pathTree
+			if (tree is None or tree.origin is not origin) and self.config.get("hierarchical_search"):
+				if self.regionRouter is None:
+					self.regionRouter = regions.RegionRouter(self.rooms, self.getReverseExits, self.blockedRooms, self.blockedExits, self.costOverrides)
+				return self.regionRouter.findDirections(origin, destination)
+			if (tree is None or tree.origin is not origin) and self.config.get("bidirectional_search"):
+				return self.findDirectionsBidirectional(origin, destination)
+			if (tree is None or tree.origin is not origin) and self.hasClosures():
+				# The route is repaired after each change, rather than searched for again.
+				if self.incrementalRouter is None or self.incrementalRouter.destination is not destination:
+					self.incrementalRouter = incremental.IncrementalRouter(self.rooms, self.getReverseExits, destination, self.blockedRooms, self.blockedExits, self.costOverrides)
+				return self.incrementalRouter.findDirections(origin)
+			if tree is None or tree.origin is not origin:
+				# The background search hasn't started from this origin, so search from scratch.
+				tree = self.newPathTree(origin)
+			# If the tree is only partly built, the search continues from where the background thread left off.
+			if tree.find(destination):
+				return self.traceParents(tree.parents, origin, destination)
+			return None
+
+	def getReverseExits(self):
+		"""Returns a dict mapping room IDs to the IDs of the rooms with exits leading into them"""
+		if self.reverseExits is None:
+			self.reverseExits = buildReverseExits(self.rooms)
+		return self.reverseExits
+
+	def findDirectionsBidirectional(self, origin, destination):
+		"""
+		Returns the same list of directions as findDirections, searching forward from the origin and backward from the destination at the same time.
+		The forward search is the same as the one in searchRooms, so that it breaks ties between routes of equal cost in the same way.
+		"""
+		if origin == destination:
+			return []
+		rooms = self.rooms
+		reverseExits = self.getReverseExits()
+		blockedRooms = self.blockedRooms
+		blockedExits = self.blockedExits
+		costOverrides = self.costOverrides
+		# The forward search records the cost from the origin to each room, including the costs of both rooms.
+		parents = {origin: origin}
+		forwardCosts = {origin: roomCost(origin, costOverrides)}
+		forwardSettled = {}
+		forwardHeap = [(forwardCosts[origin], origin)]
+		# The backward search records the cost from each room to the destination, not including the cost of the room itself.
+		backwardCosts = {destination: 0.0}
+		backwardSettled = {}
+		backwardHeap = [(0.0, destination)]
+		# The cost of the cheapest route found so far.
+		bestCost = float("inf")
+		# Stop once the 2 searches have passed each other. The tolerance makes sure that every room on a cheapest route has been settled by one of them.
+		while forwardHeap and backwardHeap and forwardHeap[0][0] + backwardHeap[0][0] <= bestCost + COST_TOLERANCE:
+			if forwardHeap[0][0] <= backwardHeap[0][0]:
+				currentRoomCost, currentRoomObj = heapq.heappop(forwardHeap)
+				if currentRoomObj in forwardSettled:
+					continue
+				forwardSettled[currentRoomObj] = currentRoomCost
+				for exitObj in currentRoomObj.exits:
+					if exitObj.to=="UNDEFINED" or exitObj.to=="DEATH" or exitObj.to not in rooms:
+						continue
+					if exitObj.to in blockedRooms or blockedExits and (currentRoomObj.id, exitObj.dir) in blockedExits:
+						continue
+					neighborRoomObj = rooms[exitObj.to]
+					neighborRoomCost = currentRoomCost + roomCost(neighborRoomObj, costOverrides)
+					if neighborRoomObj not in forwardCosts or forwardCosts[neighborRoomObj] > neighborRoomCost:
+						forwardCosts[neighborRoomObj] = neighborRoomCost
+						heapq.heappush(forwardHeap, (neighborRoomCost, neighborRoomObj))
+						parents[neighborRoomObj] = currentRoomObj
+					if neighborRoomObj in backwardCosts:
+						bestCost = min(bestCost, neighborRoomCost + backwardCosts[neighborRoomObj])
+			else:
+				currentRoomCost, currentRoomObj = heapq.heappop(backwardHeap)
+				if currentRoomObj in backwardSettled:
+					continue
+				backwardSettled[currentRoomObj] = currentRoomCost
+				if currentRoomObj.id in blockedRooms:
+					# Routes can't enter a blocked room, so it doesn't lead anywhere.
+					continue
+				neighborRoomCost = currentRoomCost + roomCost(currentRoomObj, costOverrides)
+				for neighborID in reverseExits.get(currentRoomObj.id, ()):
+					neighborRoomObj = rooms[neighborID]
+					if blockedExits and not hasOpenExit(neighborRoomObj, currentRoomObj.id, blockedExits):
+						continue
+					if neighborRoomObj not in backwardCosts or backwardCosts[neighborRoomObj] > neighborRoomCost:
+						backwardCosts[neighborRoomObj] = neighborRoomCost
+						heapq.heappush(backwardHeap, (neighborRoomCost, neighborRoomObj))
+					if neighborRoomObj in forwardCosts:
+						bestCost = min(bestCost, forwardCosts[neighborRoomObj] + neighborRoomCost)
+		if bestCost == float("inf"):
+			return None
+		# The route is traced through the parents found by the forward search, so it's the route that a forward search would have found.
+		# The rooms between the forward search and the destination still need their parents, so the forward search continues, but only through rooms settled by the backward search that lie on a cheapest route.
+		while destination not in forwardSettled and forwardHeap:
+			currentRoomCost, currentRoomObj = heapq.heappop(forwardHeap)
+			if currentRoomObj in forwardSettled:
+				continue
+			forwardSettled[currentRoomObj] = currentRoomCost
+			if currentRoomObj not in backwardSettled or currentRoomCost + backwardSettled[currentRoomObj] > bestCost + COST_TOLERANCE:
+				continue
+			for exitObj in currentRoomObj.exits:
+				if exitObj.to not in rooms or rooms[exitObj.to] not in backwardSettled:
+					continue
+				if exitObj.to in blockedRooms or blockedExits and (currentRoomObj.id, exitObj.dir) in blockedExits:
+					continue
+				neighborRoomObj = rooms[exitObj.to]
+				neighborRoomCost = currentRoomCost + roomCost(neighborRoomObj, costOverrides)
+				if neighborRoomObj not in forwardCosts or forwardCosts[neighborRoomObj] > neighborRoomCost:
+					forwardCosts[neighborRoomObj] = neighborRoomCost
+					heapq.heappush(forwardHeap, (neighborRoomCost, neighborRoomObj))
+					parents[neighborRoomObj] = currentRoomObj
+		return self.traceParents(parents, origin, destination)
+
+	def newPathTree(self, origin):
+		"""Returns an empty path tree rooted at origin"""
+		# Each key-value pare that gets added to this dict will be a parent room and child room respectively.
+		parents = {origin: origin}
+		return PathTree(origin, parents, self.searchRooms(origin, parents))
+
+	def searchRooms(self, origin, parents):
+		"""Yields tuples containing the cost and room object of each room reachable from origin, cheapest first, recording the route to each room in parents"""
+		# unprocessed rooms.
+		opened = []
+		# Using a binary heap for storing unvisited rooms significantly increases performance.
+		# https://en.wikipedia.org/wiki/Binary_heap
+		heapq.heapify(opened)
+		# Rooms whose cost has been changed with the cost command are looked up here.
+		costOverrides = self.costOverrides
+		# Put the origin cost and origin room on the opened rooms heap to be processed first.
+		heapq.heappush(opened, (roomCost(origin, costOverrides), origin))
+		# previously processed rooms.
+		closed = {}
+		# Ignore the origin from the search by adding it to the closed rooms dict.
+		closed[origin] = roomCost(origin, costOverrides)
+		# Search while there are rooms left in the opened heap.
+		while opened:
+			# Pop the last room cost and room object reference off the opened heap for processing.
+			currentRoomCost, currentRoomObj = heapq.heappop(opened)
+			# The caller stops the search once the destination has been yielded.
+			yield currentRoomCost, currentRoomObj
+			# Loop through the exits, and process each room linked to the current room.
+			for exitObj in currentRoomObj.exits:
+				# Ignore exits that link to undefined or death trap rooms.
+				if exitObj.to=="UNDEFINED" or exitObj.to=="DEATH" or exitObj.to not in self.rooms:
+					continue
+				# Ignore exits and rooms that have been blocked.
+				if exitObj.to in self.blockedRooms or self.blockedExits and (currentRoomObj.id, exitObj.dir) in self.blockedExits:
+					continue
+				# Get a reference to the room object that the exit leads to using the room's unique ID number.
+				neighborRoomObj = self.rooms[exitObj.to]
+				# The neighbor room cost should be the sum of all movement costs to get to the neighbor room from the origin room.
+				# roomCost is written out here, because a function call for every exit slows down the search.
+				neighborRoomCost = currentRoomCost + (costOverrides.get(neighborRoomObj.id, neighborRoomObj.cost) if costOverrides else neighborRoomObj.cost)
+				# We're only interested in the neighbor room if it hasn't been encountered yet, or if the cost of moving from the current room to the neighbor room is less than the cost of moving to the neighbor room from a previously discovered room.
+				if neighborRoomObj not in closed or closed[neighborRoomObj] > neighborRoomCost:
+					# Add the room object and room cost to the dict of closed rooms, and put it on the opened rooms heap to be processed.
+					closed[neighborRoomObj] = neighborRoomCost
+					heapq.heappush(opened, (neighborRoomCost, neighborRoomObj))
+					# Since the current room is so far the most optimal way into the neighbor room, set it as the parent of the neighbor room.
+					parents[neighborRoomObj] = currentRoomObj
+		# If we have made it this far, we've exhausted are search of all the connected rooms.
+
+	def getCoverageGroups(self):
+		"""Returns a dict mapping 'region' and 'terrain' to dicts mapping each region or terrain type to a tuple containing the bitmap of its rooms as an integer and the number of rooms"""
+		if self.coverageGroups is None:
+			groups = {"region": {}, "terrain": {}}
+			for kind in groups:
+				roomIDs = {}
+				for roomID, room in self.rooms.iteritems():
+					roomIDs.setdefault(getattr(room, kind, None) or "none", []).append(roomID)
+				for name, ids in roomIDs.iteritems():
+					groups[kind][name] = (visited.RoomBitmap.fromIDs(ids).toLong(), len(ids))
+			self.coverageGroups = groups
+		return self.coverageGroups
+
+	def nearestUnvisited(self):
+		"""Returns a tuple containing the cost, room object, and list of directions of the cheapest route to a room that hasn't been visited, or None if every reachable room has been visited"""
+		parents = {self.room: self.room}
+		for cost, room in self.searchRooms(self.room, parents):
+			if room.id not in self.visited:
+				return cost, room, self.traceParents(parents, self.room, room)
+		return None
+
+	def coverageReport(self):
+		"""Returns a list of lines describing the share of the rooms in each region and terrain type that have been visited"""
+		groups = self.getCoverageGroups()
+		visitedBits = self.visited.toLong()
+		percentage = lambda count, total: 100.0 * count / total if total else 0.0
+		count = sum(bin(visitedBits & mask).count("1") for mask, total in groups["terrain"].itervalues())
+		lines = ["Visited %d of %d rooms (%.1f%%)." % (count, len(self.rooms), percentage(count, len(self.rooms)))]
+		nearest = self.nearestUnvisited()
+		if nearest is None:
+			lines.append("Every room that can be reached from here has been visited.")
+		else:
+			cost, room, pathDirections = nearest
+			lines.append("Nearest unvisited room: %s (ID %s), cost %.1f: %s" % (self.filterAnsi(getattr(room, "name", "")), room.id, cost, self.createSpeedWalk(pathDirections)))
+		for kind in ("region", "terrain"):
+			# MMapper rooms don't have regions, so there's nothing to report if every room is in the same one.
+			if kind == "region" and groups[kind].keys() == ["none"]:
+				continue
+			lines.append("By %s:" % kind)
+			for name, (mask, total) in sorted(groups[kind].iteritems()):
+				count = bin(visitedBits & mask).count("1")
+				lines.append("%s: %d of %d (%.1f%%)" % (name, count, total, percentage(count, total)))
+		return lines
+
+	def startPathTrees(self):
+		"""Starts a background thread that builds the path tree of the current room whenever the user moves"""
+		self.pathTreeCondition = threading.Condition()
+		self.pathTreeThread = threading.Thread(target=self.pathTreeLoop)
+		self.pathTreeThread.daemon = True
+		self.pathTreeThread.start()
+		self.requestPathTree(self.room)
+
+	def stopPathTrees(self):
+		"""Stops the background path search, so that it isn't interrupted by the interpreter shutting down"""
+		if self.pathTreeCondition is None:
+			return
+		with self.pathTreeCondition:
+			self.pathTreeStopped = True
+			self.pathTreeCondition.notify()
+		# The thread can't be stopped while it is waiting for the database to load.
+		if self.loaded.is_set():
+			self.pathTreeThread.join()
+
+	def requestPathTree(self, room):
+		"""Asks the background thread to start building the path tree of room, abandoning the tree it is working on"""
+		if self.pathTreeCondition is None:
+			return
+		if self.hasClosures():
+			# While rooms or exits are blocked, routes are repaired by the incremental router instead.
+			room = None
+		with self.pathTreeCondition:
+			self.pathTreeOrigin = room
+			self.pathTreeCondition.notify()
+
+	def pathTreeLoop(self):
+		# Routes can lead anywhere, so wait until every room has been loaded.
+		self.loaded.wait()
+		while True:
+			with self.pathTreeCondition:
+				while self.pathTreeOrigin is None and not self.pathTreeStopped:
+					self.pathTreeCondition.wait()
+				if self.pathTreeStopped:
+					return
+				origin, self.pathTreeOrigin = self.pathTreeOrigin, None
+			with self.lock:
+				# The room may have been replaced by a reload since it was requested.
+				if self.rooms.get(origin.id) is not origin or self.pathTree is not None and self.pathTree.origin is origin:
+					continue
+				tree = self.pathTree = self.newPathTree(origin)
+			# Settle the rooms in small slices, holding the lock so that the rooms dict doesn't change underneath the search, and pausing between slices so that the user's commands aren't held up.
+			# The tree is abandoned as soon as the user moves, or a reload replaces it.
+			while self.pathTreeOrigin is None and self.pathTree is tree and not self.pathTreeStopped:
+				with self.lock:
+					if self.pathTree is not tree or not tree.advance(PATH_TREE_SLICE):
+						break
+				time.sleep(PATH_TREE_PAUSE)
+
+	def traceParents(self, parents, origin, destination):
+		"""Returns the list of direction names leading from origin to destination, given a dict mapping rooms to the rooms they were reached from"""
+		pathDirections = []
+		currentRoomObj = destination
+		# find the path from the origin to the destination by traversing the rooms that we passed through to get here.
+		while currentRoomObj != origin:
+			# Loop through the exits of the parent room, and find which exit links to the current room.
+			for roomObj in parents[currentRoomObj].exits:
+				if roomObj.to == currentRoomObj.id and (parents[currentRoomObj].id, roomObj.dir) not in self.blockedExits:
+					# Insert the direction name at the beginning of the pathDirections list.
+					pathDirections.insert(0, roomObj.dir)
+					break
+			# The parent room becomes the current room, and we repeat until all the parent rooms have been traversed.
+			currentRoomObj = parents[currentRoomObj]
+		return pathDirections
+
+	def expandSpeedWalk(self, speedWalk):
+		"""Yields the single letter directions in a speed walk, such as '3n2ew', one at a time, so that a long walk is never held in memory"""
+		for match in SPEEDWALK_STEP_REGEX.finditer(speedWalk):
+			count, direction = match.groups()
+			for i in xrange(int(count or 1)):
+				yield direction
+
+	def runSpeedWalk(self, speedWalk, trace=False):
+		"""Walks the route in a speed walk from the current room, stopping before any exit that doesn't lead to a known room"""
+		if not SPEEDWALK_REGEX.match(speedWalk):
+			print >> self.out, "Invalid speed walk: %s" % speedWalk
+			return
+		counts = [int(count or 1) for count, direction in SPEEDWALK_STEP_REGEX.findall(speedWalk)]
+		if not sum(counts):
+			print >> self.out, "Invalid speed walk: %s" % speedWalk
+			return
+		# A walk can't pass through more rooms than there are without going round in circles, so larger counts are rejected rather than walked.
+		if max(counts) > len(self.rooms):
+			print >> self.out, "Invalid speed walk: %s. A direction can't be repeated more than %d times." % (speedWalk, len(self.rooms))
+			return
+		traceList = []
+		# The IDs of the rooms passed through, which are all marked as visited, not just the last one.
+		walkedIDs = []
+		room = self.room
+		error = None
+		# Validate every step against the exits of the rooms along the route before moving.
+		for step, direction in enumerate(self.expandSpeedWalk(speedWalk), 1):
+			exitObj = room.directionPrefixes().get(direction)
+			if exitObj is None:
+				error = "No exit leading %s from room %s." % (SPEEDWALK_DIRECTIONS[direction], room.id)
+			elif exitObj.to == "DEATH":
+				error = "Death trap %s of room %s." % (exitObj.dir, room.id)
+			elif exitObj.to == "UNDEFINED" or not self.waitForRoom(exitObj.to):
+				error = "Undefined room %s of room %s." % (exitObj.dir, room.id)
+			if error:
+				error = "Stopped at step %d of %d: %s" % (step, sum(counts), error)
+				break
+			room = self.rooms[exitObj.to]
+			walkedIDs.append(room.id)
+			traceList.append("%s: %s" % (exitObj.dir, self.filterAnsi(getattr(room, "name", ""))))
+		if trace and traceList:
+			self.page(traceList)
+		if error:
+			print >> self.out, error
+		self.visited.update(walkedIDs)
+		if room != self.room:
+			self.setRoom(room.id)
+			self.look()
+
+	def labelRoom(self, label, target):
+		"""Maps a 1-word, alphanumeric label to a room ID"""
+		if target == "none":
+			# If the target is 'none', delete the label if defined.
+			try:
+				self.config["labels"].pop(label)
+			except KeyError:
+				return "Error: No label with that name exists."
+			self.removeLabelCommand(label)
+			self.saveConfig()
+			return "Label %s removed." % label
+		elif self.waitForRoom(target):
+			# create the label and save the configuration to disk
+			self.config["labels"][label] = target
+			self.addLabelCommand(label)
+			self.saveConfig()
+			return "label %s added for room ID %s." % (label, target)
+		else:
+			# The target wasn't a valid room ID in self.rooms
+			return "Error: invalid room ID."
+
+	def watchDatabase(self, interval=DATABASE_POLL_INTERVAL):
+		"""Starts a background thread that reloads the database whenever the database file changes"""
+		thread = threading.Thread(target=self.watchDatabaseLoop, args=(interval,))
+		thread.daemon = True
+		thread.start()
+
+	def watchDatabaseLoop(self, interval):
+		self.loaded.wait()
+		lastStat = stat = self.databaseStat()
+		while True:
+			time.sleep(interval)
+			previousStat, stat = stat, self.databaseStat()
+			# Wait until the file has stopped changing, so that a file which is still being written isn't loaded.
+			if stat is None or stat == lastStat or stat != previousStat:
+				continue
+			lastStat = stat
+			try:
+				message = self.reloadDatabase()
+			except Exception as e:
+				message = "Unable to reload the world database: %s" % (e or type(e).__name__)
+			with self.lock:
+				print >> self.out, "\n%s" % message
+				self.out.write(self.prompt())
+				self.out.flush()
+
+	def databaseStat(self):
+		try:
+			result = os.stat(self.databaseFile)
+		except OSError:
+			return None
+		return result.st_mtime, result.st_size
+
+	def reloadDatabase(self):
+		"""Loads the database file again, and applies any rooms that were added, removed, or changed to the live rooms dict"""
+		# The database is parsed and compared without holding the lock, so the user can keep entering commands.
+		newDatabase = self.DBClass(self.databaseFile)
+		newRooms = newDatabase.rooms
+		removed = [roomID for roomID in self.rooms.keys() if roomID not in newRooms]
+		added = []
+		changed = []
+		for roomID, room in newRooms.iteritems():
+			if roomID not in self.rooms:
+				added.append(roomID)
+			elif roomFields(room) != roomFields(self.rooms[roomID]):
+				changed.append(roomID)
+		with self.lock:
+			oldRooms = [self.rooms[roomID] for roomID in itertools.chain(removed, changed)]
+			for roomID in removed:
+				del self.rooms[roomID]
+			for roomID in itertools.chain(added, changed):
+				self.rooms[roomID] = newRooms[roomID]
+			if self.regionRouter is not None:
+				# Only the regions around the rooms that changed need to be worked out again.
+				self.regionRouter.roomsChanged(oldRooms, [newRooms[roomID] for roomID in itertools.chain(added, changed)])
+			self.incrementalRouter = None
+			self.database = newDatabase
+			# Exits lines include the terrain of neighboring rooms, so any cached output may be out of date.
+			self.renderCache.clear()
+			if self.room.id in self.rooms:
+				self.room = self.rooms[self.room.id]
+			# Routes may have changed, so throw away the path tree, and build a new one from the current room.
+			self.pathTree = None
+			self.coverageGroups = None
+			self.reverseExits = None
+			self.requestPathTree(self.room)
+			lostLabels = sorted(label for label, roomID in self.config["labels"].iteritems() if roomID not in self.rooms)
+		message = "World database reloaded: %d rooms added, %d removed, %d changed." % (len(added), len(removed), len(changed))
+		if self.room.id not in self.rooms:
+			message += " The current room was removed."
+		if lostLabels:
+			message += " Labels of removed rooms: %s." % ", ".join(lostLabels)
+		return message
+
+	def buildCommandTable(self):
+		"""Maps every unambiguous abbreviation of the command names, as well as the room labels, to the functions that handle them"""
+		self.commands = {}
+		# The order of this list determines which command wins when an abbreviation matches more than one command name.
+		handlers = [
+			("look", self.commandLook),
+			("id", self.commandID),
+			("brief", self.commandBrief),
+			("terrain", self.commandTerrain),
+			("bidirectional", self.commandBidirectional),
+			("hierarchical", self.commandHierarchical),
+			("exits", self.commandExits),
+			("path", self.commandPath),
+			("run", self.commandRun),
+			("label", self.commandLabel),
+			("memstats", self.commandMemStats),
+			("coverage", self.commandCoverage),
+			("block", self.commandBlock),
+			("unblock", self.commandUnblock),
+			("cost", self.commandCost)]
+		for name, handler in handlers:
+			for length in xrange(1, len(name) + 1):
+				# 'e' is reserved for east, even if the current room has no exit in that direction.
+				if name == "exits" and length == 1:
+					continue
+				self.commands.setdefault(name[:length], handler)
+		# Room labels must be typed out in full, and have a lower priority than the built-in commands.
+		for label in self.config["labels"]:
+			self.addLabelCommand(label)
+
+	def addLabelCommand(self, label):
+		"""Adds a label to the command table, unless a built-in command is already using that name"""
+		self.commands.setdefault(label, functools.partial(self.commandGoToLabel, label))
+
+	def removeLabelCommand(self, label):
+		"""Removes a label from the command table, leaving any built-in command with the same name intact"""
+		handler = self.commands.get(label)
+		if isinstance(handler, functools.partial) and handler.func == self.commandGoToLabel:
+			del self.commands[label]
+
+	def parseInput(self, line):
+		"""Parses the user's input, and executes the appropriate command"""
+		with self.lock:
+			#split the line into words.
+			args = line.split()
+			# The first word is the command, and the rest of the words are possible arguments, so pop the first word from the list.
+			command = args.pop(0)
+			if command.isdigit():
+				# User has typed in a possible room ID.  Move to the room with that ID if possible.
+				status = self.setRoom(command)
+				if status == "UNDEFINED":
+					print >> self.out, "Invalid room ID."
+				else:
+					self.look()
+				return
+			# Directions take priority over commands, so that 'e' will move east, rather than display the exits.
+			status = self.move(command)["status"]
+			if status != "invalid":
+				if status == "undefined":
+					print >> self.out, "Undefined room in that direction."
+				elif status == "death":
+					print >> self.out, "Death trap in that direction."
+				else:
+					self.look()
+				return
+			handler = self.commands.get(command)
+			if handler is not None:
+				handler(args)
+			else:
+				print >> self.out, "Invalid command or direction!"
+
+	def commandLook(self, args):
+		self.look()
+
+	def commandID(self, args):
+		status = self.toggleSetting("show_id")
+		print >> self.out, "Show room ID %s." % ("enabled" if status else "disabled")
+
+	def commandBrief(self, args):
+		status = self.toggleSetting("brief")
+		print >> self.out, "Brief mode %s." % ("enabled" if status else "disabled")
+
+	def commandTerrain(self, args):
+		status = self.toggleSetting("use_terrain_symbols")
+		print >> self.out, "Terrain symbols in prompt %s." % ("enabled" if status else "disabled")
+
+	def commandBidirectional(self, args):
+		status = self.toggleSetting("bidirectional_search")
+		print >> self.out, "Bidirectional path search %s." % ("enabled" if status else "disabled")
+
+	def commandHierarchical(self, args):
+		status = self.toggleSetting("hierarchical_search")
+		print >> self.out, "Hierarchical path search %s." % ("enabled" if status else "disabled")
+
+	def commandExits(self, args):
+		self.longExits()
+
+	def commandPath(self, args):
+		# Routes can lead anywhere, so every room needs to be loaded.
+		self.waitUntilLoaded()
+		# The route can be walked immediately by adding 'run', or 'run trace', after the destination.
+		run = trace = False
+		# Alternative routes can be listed by adding 'alt' and the number of routes after the destination.
+		alternatives = None
+		if len(args) >= 3 and args[-2] == "alt" and args[-1].isdigit() and int(args[-1]) > 0:
+			alternatives = int(args.pop())
+			args.pop()
+		if args[-2:] == ["run", "trace"]:
+			trace = True
+			args.pop()
+		if args[-1:] == ["run"]:
+			run = True
+			args.pop()
+		# This command takes 1 or 2 arguments
+		if len(args) in [1, 2]:
+			if args[-1] in self.config["labels"]:
+				# The argument was a valid room label. Set the destination to the room object that has the ID in label.
+				destination = self.rooms.get(self.config["labels"][args.pop()])
+			else:
+				# argument is a possible room ID. Try to set the destination to the room object with that ID.
+				destination = self.rooms.get(args.pop())
+			if not args:
+				# An origin wasn't defined, so use the current room.
+				origin = self.room
+			elif args[0] in self.config["labels"]:
+				# The argument was a valid room label. Set the origin to the room object that has the ID in label.
+				origin = self.rooms.get(self.config["labels"][args.pop()])
+			else:
+				# argument is a possible room ID. Try to set the origin to the room object with that ID.
+				origin = self.rooms.get(args.pop())
+			if alternatives and origin and destination and origin != destination:
+				self.page(self.alternativeRouteLines(origin, destination, alternatives))
+			elif not run:
+				print >> self.out, self.pathFind(origin, destination)
+			elif origin != self.room:
+				print >> self.out, "Error: routes can only be run from the current room."
+			elif destination is None or destination == origin:
+				print >> self.out, self.pathFind(origin, destination)
+			else:
+				result = self.route(origin.id, destination.id)
+				if result is None:
+					print >> self.out, "No routes found."
+				else:
+					self.runSpeedWalk(result["speedWalk"], trace)
+		else:
+			print >> self.out, "Usage: path [origin] destination [run [trace]|alt count]"
+			print >> self.out, "Origin will default to the current room if not provided."
+			print >> self.out, "If 'run' is given, the route will be walked from the current room."
+			print >> self.out, "If 'alt' is given, up to count of the cheapest routes will be listed."
+
+	def alternativeRouteLines(self, origin, destination, count):
+		"""Yields the lines listing up to count of the cheapest routes from origin to destination"""
+		found = self.routes(origin.id, destination.id, count)
+		if not found:
+			yield "No routes found."
+		for number, item in enumerate(found, 1):
+			yield "%d. cost %.1f, %d steps: %s" % (number, item["cost"], len(item["directions"]), item["speedWalk"])
+
+	def commandRun(self, args):
+		if len(args) == 1 or len(args) == 2 and args[1] == "trace":
+			self.runSpeedWalk(args[0], trace=len(args) == 2)
+		else:
+			print >> self.out, "Usage: run speed_walk [trace]"
+			print >> self.out, "Walks a speed walk, such as '3n2ew', from the current room."
+			print >> self.out, "If 'trace' is given, every room along the route will be listed."
+
+	def commandLabel(self, args):
+		# This command takes 1 or 2 arguments
+		if len(args) in [1, 2]:
+			# The label is the first argument, the targeted room is the second if defined.
+			label = args.pop(0)
+			if label == "list":
+				# print a sorted list of currently defined room labels.
+				self.page(self.labelLines())
+			else:
+				# If there is a second argument, apply the label to the room with that ID. Else, apply it to the current room.
+				target = self.room.id if not args else args.pop()
+				print >> self.out, self.labelRoom(label, target)
+		else:
+			print >> self.out, "Usage: label [list|[name [room_ID]"
+			print >> self.out, "If room_ID is 'none', the label will be removed."
+			print >> self.out, "Room_ID will default to the current room ID if not provided."
+
+	def labelLines(self):
+		"""Yields the lines of the label list, sorted by label"""
+		labels = self.config["labels"]
+		yield "labels list:" if labels else "No labels defined yet."
+		for key in sorted(labels):
+			yield "%s: %s" % (key, labels[key])
+
+	def commandMemStats(self, args):
+		self.waitUntilLoaded()
+		self.page(self.memoryStats())
+
+	def commandCoverage(self, args):
+		self.waitUntilLoaded()
+		self.page(self.coverageReport())
+
+	def commandBlock(self, args):
+		if not args:
+			self.page(self.closureLines())
+		elif len(args) in [1, 2]:
+			# The room ID defaults to the current room.
+			target = self.room.id if len(args) == 1 else args[1]
+			try:
+				if args[0] == "room":
+					if self.blockRoom(target):
+						print >> self.out, "Routes will avoid room %s." % target
+					else:
+						print >> self.out, "Room %s is already blocked." % target
+				else:
+					direction = self.blockExit(target, args[0])
+					if direction:
+						print >> self.out, "Routes will avoid the exit %s of room %s." % (direction, target)
+					else:
+						print >> self.out, "That exit is already blocked."
+			except ValueError as e:
+				print >> self.out, e
+		else:
+			print >> self.out, "Usage: block [room|direction [room_ID]]"
+			print >> self.out, "Stops routes from entering a room, or taking an exit, until it is unblocked."
+			print >> self.out, "Room_ID will default to the current room ID if not provided. Without arguments, the blocked rooms and exits are listed."
+
+	def commandUnblock(self, args):
+		if args == ["all"]:
+			with self.lock:
+				for roomID, direction in list(self.blockedExits):
+					self.unblockExit(roomID, direction)
+				for roomID in list(self.blockedRooms):
+					self.unblockRoom(roomID)
+				for roomID in list(self.costOverrides):
+					self.setRoomCost(roomID, None)
+			print >> self.out, "Every room and exit is unblocked, and every room cost is reset."
+		elif len(args) in [1, 2]:
+			target = self.room.id if len(args) == 1 else args[1]
+			try:
+				if args[0] == "room":
+					if self.unblockRoom(target):
+						print >> self.out, "Routes may enter room %s again." % target
+					else:
+						print >> self.out, "Room %s isn't blocked." % target
+				else:
+					direction = self.unblockExit(target, args[0])
+					if direction:
+						print >> self.out, "Routes may take the exit %s of room %s again." % (direction, target)
+					else:
+						print >> self.out, "That exit isn't blocked."
+			except ValueError as e:
+				print >> self.out, e
+		else:
+			print >> self.out, "Usage: unblock [all|room|direction [room_ID]]"
+			print >> self.out, "'unblock all' also resets the costs changed with the cost command."
+
+	def commandCost(self, args):
+		if len(args) in [1, 2]:
+			target = self.room.id if len(args) == 1 else args[1]
+			try:
+				cost = self.setRoomCost(target, None if args[0] == "reset" else args[0])
+				print >> self.out, "The cost of room %s is %s." % (target, cost)
+			except ValueError as e:
+				print >> self.out, e
+		else:
+			print >> self.out, "Usage: cost value|reset [room_ID]"
+			print >> self.out, "Changes the cost of entering a room when finding routes, or resets it to the cost of its terrain."
+			print >> self.out, "Room_ID will default to the current room ID if not provided."
+
+	def closureLines(self):
+		"""Yields the lines listing the blocked rooms and exits, and the changed room costs"""
+		closures = self.closures()
+		if not closures["rooms"] and not closures["exits"] and not closures["costs"]:
+			yield "Nothing is blocked."
+		for roomID in closures["rooms"]:
+			yield "Room %s is blocked." % roomID
+		for roomID, direction in closures["exits"]:
+			yield "The exit %s of room %s is blocked." % (direction, roomID)
+		for roomID, cost in sorted(closures["costs"].iteritems()):
+			yield "Room %s costs %s." % (roomID, cost)
+
+	def commandGoToLabel(self, label, args):
+		# The command was a valid room label.  Move to that room.
+		self.setRoom(self.config["labels"][label])
+		self.look()
+
+
+def runBatch(world, inputFile):
+	"""Executes the commands in inputFile without user interaction, and reports the time taken by each command to stderr"""
+	latencies = []
+	timer = timeit.default_timer
+	startTime = timer()
+	world.look()
+	for line in inputFile:
+		line = line.strip().lower()
+		if not line:
+			continue
+		# Echo the command, so that the output reads like a transcript of an interactive session.
+		print >> world.out, "%s%s" % (world.prompt(), line)
+		if "quit".startswith(line):
+			break
+		commandStart = timer()
+		world.parseInput(line)
+		latencies.append((line.split()[0], timer() - commandStart))
+	world.out.flush()
+	for line in latencyReport(latencies, timer() - startTime):
+		print >> sys.stderr, line
+
+
+def latencyReport(latencies, elapsed):
+	"""Returns a list of lines summarizing a list of (command, seconds) tuples"""
+	if not latencies:
+		return ["No commands were executed."]
+	times = sorted(seconds for command, seconds in latencies)
+	total = sum(times)
+	percentile = lambda fraction: times[min(len(times) - 1, int(len(times) * fraction))]
+	lines = []
+	lines.append("Executed %d commands in %.3f seconds (%.3f seconds including output)." % (len(times), total, elapsed))
+	lines.append("Throughput: %.1f commands per second." % (len(times) / total if total else float("inf")))
+	lines.append("Latency (ms): mean %.3f, median %.3f, 95%% %.3f, 99%% %.3f, max %.3f." % (total / len(times) * 1000, percentile(0.5) * 1000, percentile(0.95) * 1000, percentile(0.99) * 1000, times[-1] * 1000))
+	lines.append("Per command (ms):")
+	byCommand = {}
+	for command, seconds in latencies:
+		byCommand.setdefault(command, []).append(seconds)
+	for command, commandTimes in sorted(byCommand.iteritems(), key=lambda item: -sum(item[1])):
+		lines.append("%s: %d calls, mean %.3f, max %.3f" % (command, len(commandTimes), sum(commandTimes) / len(commandTimes) * 1000, max(commandTimes) * 1000))
+	return lines
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Allows you to virtually explore the Mume world.")
+	parser.add_argument("-c", "--config", help="the configuration file")
+	group = parser.add_mutually_exclusive_group()
+	group.add_argument("-m", "--mmapper", help="database is in MMapper 2 format", action="store_true")
+	group.add_argument("-p", "--pandora", help="database is in Pandora Mapper format", action="store_true")
+	parser.add_argument("-t", "--trace-memory", help="trace memory allocations while loading the database", action="store_true")
+	parser.add_argument("-s", "--snapshot", help="save a tracemalloc snapshot of the database load to this file (implies --trace-memory)")
+	parser.add_argument("-b", "--batch", help="read commands from this file ('-' for standard input) instead of prompting for them, and report the time taken by each command")
+	parser.add_argument("-g", "--progressive", help="show the starting room as soon as it has been loaded, and load the rest of the database in the background", action="store_true")
+	parser.add_argument("-w", "--watch", help="reload the database whenever the database file changes", action="store_true")
+	parser.add_argument("-j", "--jobs", help="load the database in this many worker processes", type=int)
+	parser.add_argument("-x", "--speculate", help="work out the routes from the current room in the background after every move, so that path commands can be answered immediately", action="store_true")
+	parser.add_argument("databaseFile")
+	args = parser.parse_args()
+	if args.snapshot and memstats.tracemalloc is None:
+		parser.error("--snapshot needs the tracemalloc module, which could not be imported")
+	if args.progressive and (args.trace_memory or args.snapshot):
+		# The progressive loader runs on a background thread while the user explores, so there is no single load to trace.
+		parser.error("--trace-memory and --snapshot can't be used with --progressive")
+	if not args.config:
+		print "You need to specify a configuration file."
+		return
+	if args.mmapper:
+		DBClass = mmapper.Database
+	elif args.pandora:
+		DBClass = pandora.Database
+	if args.jobs:
+		DBClass = functools.partial(DBClass, processes=args.jobs)
+	if args.batch:
+		# Write the output in large blocks, rather than flushing it after every command.
+		output = codecs.getwriter("utf-8")(os.fdopen(os.dup(sys.stdout.fileno()), "wb", BATCH_BUFFER_SIZE))
+	else:
+		output = sys.stdout
+	print >> output, "Welcome to Mume Map Emulation!"
+	print >> output, "Loading the world database."
+	world = World(configFile=args.config, DBClass=DBClass, databaseFile=args.databaseFile, traceMemory=args.trace_memory, snapshotFile=args.snapshot, output=output, usePager=not args.batch, progressive=args.progressive, speculate=args.speculate)
+	if world.loaded.is_set():
+		print >> output, "Loaded %s rooms." % str(len(world.rooms))
+	else:
+		print >> output, "Loaded %s rooms. The rest will be loaded in the background." % str(len(world.rooms))
+	if args.batch:
+		if args.batch == "-":
+			runBatch(world, sys.stdin)
+		else:
+			with open(args.batch, "rb") as inputFile:
+				runBatch(world, inputFile)
+		world.stopPathTrees()
+		world.saveConfig()
+		print >> output, "Good bye."
+		output.flush()
+		return
+	if hasattr(signal, "SIGWINCH"):
+		# Word wrap to the new dimensions when the terminal window is resized.
+		signal.signal(signal.SIGWINCH, lambda signum, frame: setattr(world, "resized", True))
+	if args.watch:
+		world.watchDatabase()
+	world.look()
+	while True:
+		line = raw_input(world.prompt()).strip().lower()
+		if line:
+			if "quit".startswith(line):
+				# Break out of the loop, save the configuration to disk, and exit the program
+				break
+			world.parseInput(line)
+	world.stopPathTrees()
+	world.saveConfig()
+	print "Good bye."
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,97 @@
+﻿#!/usr/bin/env python2
+
+import argparse
+import copy
+import json
+import re
+import SocketServer
+
+import mmapper
+import pandora
+from mume_emu import World
+
+# Telnet clients may send option negotiation sequences, which aren't part of the user's input.
+TELNET_COMMAND_REGEX = re.compile(r"\xff[\xfb-\xfe].|\xff[\xf0-\xfa]|\xff\xff")
+# Sessions are word wrapped to the size of a standard terminal.
+SESSION_WIDTH, SESSION_HEIGHT = 80, 24
+
+
+class TelnetWriter(object):
+	"""A file-like object that encodes output as UTF-8 with telnet line endings"""
+	softspace = 0
+
+	def __init__(self, fileObj):
+		self.fileObj = fileObj
+
+	def write(self, text):
+		if isinstance(text, unicode):
+			text = text.encode("utf-8")
+		self.fileObj.write(text.replace("\n", "\r\n"))
+
+	def flush(self):
+		self.fileObj.flush()
+
+
+class SessionHandler(SocketServer.StreamRequestHandler):
+	"""Handles the connection of a single user"""
+
+	def handle(self):
+		out = TelnetWriter(self.wfile)
+		# Every session gets its own copy of the settings and labels, but the rooms are shared by all of them.
+		world = World(config=copy.deepcopy(self.server.config), rooms=self.server.database.rooms, database=self.server.database, output=out, usePager=False, width=SESSION_WIDTH, height=SESSION_HEIGHT)
+		print >> out, "Welcome to Mume Map Emulation!"
+		world.look()
+		while True:
+			out.write(world.prompt())
+			out.flush()
+			line = self.rfile.readline()
+			if not line:
+				# The client disconnected.
+				break
+			line = TELNET_COMMAND_REGEX.sub("", line).strip().lower()
+			if line:
+				if "quit".startswith(line):
+					print >> out, "Good bye."
+					break
+				world.parseInput(line)
+
+
+class Server(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+	"""A telnet compatible server, giving each connected user a separate session in a shared copy of the world"""
+	allow_reuse_address = True
+	daemon_threads = True
+
+	def __init__(self, address, database, config):
+		self.database = database
+		self.config = config
+		SocketServer.TCPServer.__init__(self, address, SessionHandler)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Allows multiple users to virtually explore the Mume world over telnet.")
+	parser.add_argument("-c", "--config", help="the configuration file that new sessions start from", required=True)
+	group = parser.add_mutually_exclusive_group(required=True)
+	group.add_argument("-m", "--mmapper", help="database is in MMapper 2 format", action="store_true")
+	group.add_argument("-p", "--pandora", help="database is in Pandora Mapper format", action="store_true")
+	parser.add_argument("-H", "--host", help="the address to listen on", default="localhost")
+	parser.add_argument("-P", "--port", help="the port to listen on", type=int, default=4000)
+	parser.add_argument("databaseFile")
+	args = parser.parse_args()
+	DBClass = mmapper.Database if args.mmapper else pandora.Database
+	with open(args.config, "rb") as data:
+		config = json.load(data, encoding="UTF-8")
+	print "Loading the world database."
+	database = DBClass(args.databaseFile)
+	print "Loaded %s rooms." % str(len(database.rooms))
+	server = Server((args.host, args.port), database, config)
+	print "Listening on %s:%d." % server.server_address
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	server.server_close()
+	print "Good bye."
+
+
+if __name__ == "__main__":
+	main()
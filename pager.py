@@ -0,0 +1,48 @@
+﻿import itertools
+
+
+MORE_PROMPT = "-- More -- (Enter: next page, /text: search, n: search again, q: quit) "
+# The number of lines joined into each write when output is streamed rather than paged.
+STREAM_CHUNK_LINES = 256
+
+
+def streamLines(lines, out, chunkSize=STREAM_CHUNK_LINES):
+	"""Writes every line from an iterable to out, joining them into large blocks rather than writing them one at a time"""
+	lines = iter(lines)
+	for chunk in iter(lambda: list(itertools.islice(lines, chunkSize)), []):
+		print >> out, "\n".join(chunk)
+
+
+def pageLines(lines, out, height, readInput=raw_input):
+	"""
+	Writes the lines from an iterable to out one screen at a time, asking the user what to do after each screen.
+	Lines are only taken from the iterable as they are needed, so a generator is never consumed past the screen being shown.
+	"""
+	lines = iter(lines)
+	# Leave a line at the bottom of the screen for the prompt.
+	pageSize = max(1, height - 1)
+	page = list(itertools.islice(lines, pageSize))
+	pattern = None
+	while page:
+		print >> out, "\n".join(page)
+		# Take the first line of the next screen, so that the prompt isn't shown after the last one.
+		nextLine = next(lines, None)
+		if nextLine is None:
+			return
+		out.flush()
+		try:
+			response = readInput(MORE_PROMPT).strip()
+		except EOFError:
+			return
+		if response.lower() in ("q", "quit"):
+			return
+		if response.startswith("/") and response[1:]:
+			pattern = response[1:].lower()
+		if pattern is not None and (response.startswith("/") or response.lower() == "n"):
+			# Skip ahead to the next line containing the search text, which starts the next screen.
+			nextLine = next((line for line in itertools.chain([nextLine], lines) if pattern in line.lower()), None)
+			if nextLine is None:
+				print >> out, "Pattern not found."
+				return
+		page = [nextLine]
+		page.extend(itertools.islice(lines, pageSize - 1))
@@ -1,54 +1,158 @@
-﻿from collections import OrderedDict
-try:
-	import xml.etree.cElementTree as ET
-except ImportError:
-	import xml.etree.ElementTree as ET
-
-from rooms import Room, Exit
-
-
-class Database(object):
-	"""Pandora database class"""
-	directionNames = OrderedDict([
-		("n", "north"),
-		("s", "south"),
-		("e", "east"),
-		("w", "west"),
-		("u", "up"),
-		("d", "down")])
-
-	def getElements(self, fileName, tag):
-		"""returns an iterater of all the tags matching tag from the xml file in fileName"""
-		context = iter(ET.iterparse(fileName, events=("start", "end")))
-		event, root = next(context)
-		for event, element in context:
-			if event=="end" and element.tag==tag:
-				yield element
-				# Free up the memory used.
-				root.clear()
-
-	def __init__(self, fileName):
-		# iterate through the rooms in the database, creating an object for each room.
-		self.rooms = {}
-		for element in self.getElements(fileName, "room"):
-			obj = Room()
-			obj.id = element.get("id")
-			obj.x = element.get("x")
-			obj.y = element.get("y")
-			obj.z = element.get("z")
-			obj.region = element.get("region")
-			obj.terrain = element.get("terrain", "UNDEFINED")
-			obj.name = element.findtext("roomname")
-			obj.desc = element.findtext("desc")
-			obj.note = element.findtext("note")
-			obj.exits = []
-			for x in element.findall("./exits/exit"):
-				newExit = Exit()
-				newExit.dir = self.directionNames[x.get("dir")]
-				newExit.to = x.get("to")
-				newExit.door = x.get("door")
-				obj.exits.append(newExit)
-			obj.exits.sort(key=lambda k:self.directionNames.values().index(k.dir))
-			obj.setCost(obj.terrain)
-			# Add a reference to the room object to our self.rooms dict, using the room ID as the key.
-			self.rooms[obj.id] = obj
+﻿from collections import OrderedDict
+import mmap
+import multiprocessing
+import re
+try:
+	import xml.etree.cElementTree as ET
+except ImportError:
+	import xml.etree.ElementTree as ET
+
+from rooms import Room, Exit, TextPool
+
+
+# The number of chunks of the file given to each worker process when parsing in parallel.
+CHUNKS_PER_PROCESS = 4
+# A room element starts with '<room' followed by white space, '>', or '/', which excludes the roomname element.
+ROOM_START_REGEX = re.compile(r"<room[\s>/]")
+ROOM_END = "</room>"
+XML_ENCODING_REGEX = re.compile(r"""^(?:\xef\xbb\xbf)?<\?xml[^>]*\sencoding=["']([^"']+)["']""")
+
+
+def iterElements(fileName, tag):
+	"""returns an iterater of all the tags matching tag from the xml file in fileName"""
+	context = iter(ET.iterparse(fileName, events=("start", "end")))
+	event, root = next(context)
+	for event, element in context:
+		if event=="end" and element.tag==tag:
+			yield element
+			# Free up the memory used.
+			root.clear()
+
+
+def roomRecord(element, directionNames):
+	"""Returns a tuple containing the fields of a room element, with the exits in the order of directionNames"""
+	exits = []
+	for x in element.findall("./exits/exit"):
+		exits.append((directionNames[x.get("dir")], x.get("to"), x.get("door")))
+	order = directionNames.values()
+	exits.sort(key=lambda k:order.index(k[0]))
+	return (element.get("id"), element.get("x"), element.get("y"), element.get("z"), element.get("region"), element.get("terrain", "UNDEFINED"), element.findtext("roomname"), element.findtext("desc"), element.findtext("note"), exits)
+
+
+def roomFromRecord(record, textPool=None):
+	"""Returns a Room object made from a room record, sharing its text through textPool if it's given"""
+	intern = textPool.intern if textPool is not None else lambda text: text
+	obj = Room()
+	obj.id, obj.x, obj.y, obj.z, region, terrain, name, desc, note, exits = record
+	obj.region = intern(region)
+	obj.terrain = intern(terrain)
+	obj.name = intern(name)
+	obj.desc = intern(desc)
+	obj.note = intern(note)
+	obj.exits = []
+	for direction, to, door in exits:
+		newExit = Exit()
+		newExit.dir = direction
+		newExit.to = to
+		newExit.door = intern(door)
+		obj.exits.append(newExit)
+	obj.setCost(obj.terrain)
+	return obj
+
+
+def iterRooms(fileName, directionNames, textPool=None):
+	"""Yields a Room object for every room element in fileName, parsing the file one element at a time"""
+	for element in iterElements(fileName, "room"):
+		yield roomFromRecord(roomRecord(element, directionNames), textPool)
+
+
+def findRoomBoundaries(fileName, chunksCount):
+	"""
+	Returns a list of tuples containing the start and end byte offsets of up to chunksCount ranges of roughly equal size in fileName.
+	Every range starts at the start of a room element, and ends at the start of the next range, except for the last range, which ends after the last room element.
+	"""
+	with open(fileName, "rb") as fileObj:
+		data = mmap.mmap(fileObj.fileno(), 0, access=mmap.ACCESS_READ)
+	try:
+		match = ROOM_START_REGEX.search(data)
+		if match is None:
+			return []
+		end = data.rfind(ROOM_END) + len(ROOM_END)
+		chunkSize = (end - match.start()) // chunksCount + 1
+		starts = [match.start()]
+		while True:
+			match = ROOM_START_REGEX.search(data, starts[-1] + chunkSize)
+			if match is None or match.start() >= end:
+				break
+			starts.append(match.start())
+	finally:
+		data.close()
+	return zip(starts, starts[1:] + [end])
+
+
+def _parseRooms(chunk):
+	fileName, start, end, directionNames = chunk
+	with open(fileName, "rb") as fileObj:
+		fileObj.seek(start)
+		data = fileObj.read(end - start)
+	# The range only contains room elements, so wrap them in a root element to make it a complete document.
+	root = ET.fromstring("<rooms>%s</rooms>" % data)
+	return [roomRecord(element, directionNames) for element in root.iterfind("room")]
+
+
+def iterRecordsParallel(fileName, processes, directionNames):
+	"""Yields the room records in fileName, in the order they appear in the file, parsing ranges of the file in a pool of worker processes"""
+	chunks = [(fileName, start, end, directionNames) for start, end in findRoomBoundaries(fileName, processes * CHUNKS_PER_PROCESS)]
+	pool = multiprocessing.Pool(processes)
+	try:
+		# The chunks are returned in order, each one as soon as it and the ones before it are parsed.
+		for records in pool.imap(_parseRooms, chunks):
+			for record in records:
+				yield record
+	finally:
+		pool.close()
+		pool.join()
+
+
+def isUTF8(fileName):
+	"""Returns True if the XML declaration of fileName doesn't specify an encoding other than UTF-8"""
+	with open(fileName, "rb") as fileObj:
+		match = XML_ENCODING_REGEX.match(fileObj.read(256))
+	return match is None or match.group(1).lower() in ("utf-8", "utf8")
+
+
+class Database(object):
+	"""Pandora database class"""
+	directionNames = OrderedDict([
+		("n", "north"),
+		("s", "south"),
+		("e", "east"),
+		("w", "west"),
+		("u", "up"),
+		("d", "down")])
+
+	def getElements(self, fileName, tag):
+		"""returns an iterater of all the tags matching tag from the xml file in fileName"""
+		return iterElements(fileName, tag)
+
+	def __init__(self, fileName, rooms=None, roomLoaded=None, processes=None):
+		"""
+		Loads the rooms from fileName into the rooms dict, or a new dict if rooms is None.
+		If roomLoaded is given, it will be called with every room after the room is added.
+		If processes is given, ranges of the file will be parsed in that many worker processes. Files in encodings other than UTF-8 are always parsed serially, because the ranges are parsed without the XML declaration.
+		"""
+		if processes and isUTF8(fileName):
+			records = iterRecordsParallel(fileName, processes, self.directionNames)
+		else:
+			records = (roomRecord(element, self.directionNames) for element in self.getElements(fileName, "room"))
+		# Rooms with the same text share a single copy of it.
+		self.textPool = textPool = TextPool()
+		# iterate through the rooms in the database, creating an object for each room.
+		self.rooms = {} if rooms is None else rooms
+		for record in records:
+			obj = roomFromRecord(record, textPool)
+			# Add a reference to the room object to our self.rooms dict, using the room ID as the key.
+			self.rooms[obj.id] = obj
+			if roomLoaded is not None:
+				roomLoaded(obj)
+		textPool.close()
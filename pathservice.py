@@ -0,0 +1,215 @@
+﻿#!/usr/bin/env python2
+
+import argparse
+import array
+import ctypes
+import heapq
+import itertools
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import tempfile
+
+import mmapper
+import pandora
+
+
+GRAPH_MAGIC = 0x4d475246
+HEADER_FORMAT = ">IIII"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+DIRECTION_NAMES = ("north", "south", "east", "west", "up", "down", "unknown")
+
+# The graph of the worker process, mapped from the graph file.
+_graph = None
+
+
+class SharedGraph(object):
+	"""
+	A read only view of the room graph stored in a graph file.
+	The arrays are mapped directly from the file, so that every process using the same file shares a single copy of the graph.
+	The graph is in compressed sparse row format. The exits of the room with index i are the entries from offsets[i] to offsets[i+1] in the targets and directions arrays.
+	"""
+
+	def __init__(self, fileName):
+		with open(fileName, "rb") as fileObj:
+			# Copy on write access is used because ctypes requires a writable buffer. The graph is never written to.
+			self.map = mmap.mmap(fileObj.fileno(), 0, access=mmap.ACCESS_COPY)
+		magic, self.roomsCount, self.exitsCount, reserved = struct.unpack_from(HEADER_FORMAT, self.map)
+		if magic != GRAPH_MAGIC:
+			raise ValueError("%s is not a graph file." % fileName)
+		position = HEADER_SIZE
+		self.costs = (ctypes.c_double * self.roomsCount).from_buffer(self.map, position)
+		position += 8 * self.roomsCount
+		self.offsets = (ctypes.c_uint32 * (self.roomsCount + 1)).from_buffer(self.map, position)
+		position += 4 * (self.roomsCount + 1)
+		self.targets = (ctypes.c_uint32 * self.exitsCount).from_buffer(self.map, position)
+		position += 4 * self.exitsCount
+		self.directions = (ctypes.c_uint8 * self.exitsCount).from_buffer(self.map, position)
+
+	def search(self, origin, destination):
+		"""Returns a tuple containing the cost and the list of direction codes of the cheapest route from origin to destination, or None if there isn't a route"""
+		costs, offsets, targets = self.costs, self.offsets, self.targets
+		# Each room maps to the index of the exit used to enter it.
+		parents = {origin: None}
+		distances = {origin: 0.0}
+		opened = [(0.0, origin)]
+		closed = set()
+		while opened:
+			currentCost, current = heapq.heappop(opened)
+			if current == destination:
+				codes = []
+				while parents[current] is not None:
+					exitIndex, current = parents[current]
+					codes.append(self.directions[exitIndex])
+				codes.reverse()
+				return currentCost, codes
+			if current in closed:
+				continue
+			closed.add(current)
+			for exitIndex in xrange(offsets[current], offsets[current + 1]):
+				neighbor = targets[exitIndex]
+				neighborCost = currentCost + costs[neighbor]
+				# Only a strictly cheaper route replaces a known one, so the first of several exits into the same room is used.
+				if neighbor not in distances or distances[neighbor] > neighborCost:
+					distances[neighbor] = neighborCost
+					parents[neighbor] = (exitIndex, current)
+					heapq.heappush(opened, (neighborCost, neighbor))
+		return None
+
+
+def exportGraph(rooms, fileName):
+	"""Writes the room graph to fileName, and returns a list of the room IDs in index order"""
+	roomIDs = sorted(rooms, key=lambda roomID: (len(roomID), roomID))
+	indexes = dict((roomID, index) for index, roomID in enumerate(roomIDs))
+	costs = array.array("d")
+	offsets = array.array("I", [0])
+	targets = array.array("I")
+	directions = array.array("B")
+	for roomID in roomIDs:
+		room = rooms[roomID]
+		costs.append(room.cost)
+		for exitObj in room.exits:
+			# Exits that link to undefined or death trap rooms are left out.
+			if exitObj.to in indexes:
+				targets.append(indexes[exitObj.to])
+				directions.append(DIRECTION_NAMES.index(exitObj.dir))
+		offsets.append(len(targets))
+	with open(fileName, "wb") as fileObj:
+		fileObj.write(struct.pack(HEADER_FORMAT, GRAPH_MAGIC, len(roomIDs), len(targets), 0))
+		for values in (costs, offsets, targets, directions):
+			values.tofile(fileObj)
+	return roomIDs
+
+
+def _initWorker(fileName):
+	global _graph
+	_graph = SharedGraph(fileName)
+
+
+def _query(indexes):
+	origin, destination = indexes
+	return _graph.search(origin, destination)
+
+
+def _queryBatch(queries):
+	return [_query(indexes) for indexes in queries]
+
+
+class PathService(object):
+	"""Answers path queries in a pool of worker processes sharing a single copy of the room graph"""
+
+	def __init__(self, rooms, processes=None, fileName=None):
+		if fileName is None:
+			fd, fileName = tempfile.mkstemp(suffix=".graph")
+			os.close(fd)
+			self.temporaryFile = True
+		else:
+			self.temporaryFile = False
+		self.fileName = fileName
+		self.roomIDs = exportGraph(rooms, fileName)
+		self.indexes = dict((roomID, index) for index, roomID in enumerate(self.roomIDs))
+		self.pool = multiprocessing.Pool(processes, initializer=_initWorker, initargs=(fileName,))
+
+	def _indexes(self, origin, destination):
+		try:
+			return self.indexes[origin], self.indexes[destination]
+		except KeyError:
+			raise ValueError("Invalid origin or destination.")
+
+	def submit(self, origin, destination):
+		"""Submits a query for the route between 2 room IDs, and returns a handle to pass to result"""
+		return self.pool.apply_async(_query, (self._indexes(origin, destination),))
+
+	def submitBatch(self, queries, chunkSize=64):
+		"""Submits a list of (origin, destination) room ID tuples, and returns a handle to pass to result"""
+		queries = [self._indexes(origin, destination) for origin, destination in queries]
+		chunks = [queries[i:i + chunkSize] for i in xrange(0, len(queries), chunkSize)]
+		return self.pool.map_async(_queryBatch, chunks)
+
+	def result(self, handle, timeout=None):
+		"""
+		Waits for a submitted query, and returns its result.
+		The result of a single query is a tuple containing the cost and speed walk of the route, or None if there isn't a route.
+		The result of a batch is a list of these, in the order of the queries.
+		"""
+		value = handle.get(timeout)
+		if isinstance(value, list):
+			return [self._format(item) for item in itertools.chain.from_iterable(value)]
+		return self._format(value)
+
+	def _format(self, value):
+		if value is None:
+			return None
+		cost, codes = value
+		speedWalk = []
+		for code, group in itertools.groupby(codes):
+			count = len(list(group))
+			letter = DIRECTION_NAMES[code][0]
+			speedWalk.append(letter if count == 1 else "%d%s" % (count, letter))
+		return cost, "".join(speedWalk)
+
+	def path(self, origin, destination):
+		"""Returns the cost and speed walk of the cheapest route between 2 room IDs, or None if there isn't a route"""
+		return self.result(self.submit(origin, destination))
+
+	def distance(self, origin, destination):
+		"""Returns the cost of the cheapest route between 2 room IDs, or None if there isn't a route"""
+		value = self.path(origin, destination)
+		return None if value is None else value[0]
+
+	def close(self):
+		self.pool.close()
+		self.pool.join()
+		if self.temporaryFile:
+			os.remove(self.fileName)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Answers path queries read from standard input, one 'origin destination' pair of room IDs per line.")
+	group = parser.add_mutually_exclusive_group(required=True)
+	group.add_argument("-m", "--mmapper", help="database is in MMapper 2 format", action="store_true")
+	group.add_argument("-p", "--pandora", help="database is in Pandora Mapper format", action="store_true")
+	parser.add_argument("-j", "--jobs", help="the number of worker processes", type=int)
+	parser.add_argument("databaseFile")
+	args = parser.parse_args()
+	DBClass = mmapper.Database if args.mmapper else pandora.Database
+	service = PathService(DBClass(args.databaseFile).rooms, args.jobs)
+	try:
+		queries = [tuple(line.split()) for line in sys.stdin if len(line.split()) == 2]
+		# Queries with unknown room IDs are answered with an error, rather than stopping the whole batch.
+		valid = [query for query in queries if query[0] in service.indexes and query[1] in service.indexes]
+		results = dict(zip(valid, service.result(service.submitBatch(valid))))
+		for origin, destination in queries:
+			if (origin, destination) not in results:
+				print "%s %s %s" % (origin, destination, "Error: Invalid origin or destination.")
+				continue
+			value = results[(origin, destination)]
+			print "%s %s %s" % (origin, destination, "No routes found." if value is None else "%.1f %s" % value)
+	finally:
+		service.close()
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,234 @@
+﻿import heapq
+import itertools
+
+from rooms import hasOpenExit, roomCost
+
+
+# The width and height, in rooms, of the zones that rooms without a region are grouped into.
+ZONE_SIZE = 20
+
+
+def regionKey(room):
+	"""Returns the region of a room, or the zone of its coordinates if it doesn't have one"""
+	region = getattr(room, "region", None)
+	if region:
+		return region
+	return (int(room.x) // ZONE_SIZE, int(room.y) // ZONE_SIZE, int(room.z))
+
+
+def exitDirection(room, target, blockedExits=frozenset()):
+	"""Returns the direction of the first exit of room that leads to target, and isn't in blockedExits"""
+	for exitObj in room.exits:
+		if exitObj.to == target.id and (room.id, exitObj.dir) not in blockedExits:
+			return exitObj.dir
+
+
+class Region(object):
+	"""The portal rooms of a region, and the cheapest routes inside the region from each entrance to each exit"""
+
+	def __init__(self, key, entrances, exits):
+		self.key = key
+		# Rooms that can be entered from another region, and rooms with exits leading to another region.
+		self.entrances = entrances
+		self.exits = exits
+		# Maps each entrance to a list of (cost, exit room) tuples, and to the parents found by the search from it.
+		self.edges = {}
+		self.parents = {}
+
+
+class RegionRouter(object):
+	"""
+	Finds routes on a graph of the portal rooms between regions, rather than on the graph of every room.
+	The routes inside a region are worked out the first time the region is needed, and only the regions affected by a change to the rooms are worked out again.
+	"""
+
+	def __init__(self, rooms, getReverseExits, blockedRooms=frozenset(), blockedExits=frozenset(), costOverrides=None):
+		self.rooms = rooms
+		self.getReverseExits = getReverseExits
+		# Sets of room IDs that can't be entered, and (room ID, direction) tuples of exits that can't be taken, and a dict mapping the IDs of rooms whose cost has been changed to their new costs.
+		# The regions around a room must be forgotten with roomsChanged when these change.
+		self.blockedRooms = blockedRooms
+		self.blockedExits = blockedExits
+		self.costOverrides = costOverrides
+		# Maps region keys to the IDs of their rooms, and room IDs to their region keys.
+		self.members = None
+		self.roomRegions = None
+		self.regions = {}
+
+	def buildMembers(self):
+		self.members = {}
+		self.roomRegions = {}
+		for roomID, room in self.rooms.iteritems():
+			key = self.roomRegions[roomID] = regionKey(room)
+			self.members.setdefault(key, set()).add(roomID)
+
+	def roomsChanged(self, oldRooms, newRooms):
+		"""Forgets the regions affected by replacing the room objects in oldRooms with those in newRooms. Call this after the rooms dict has been changed"""
+		if self.members is None:
+			return
+		affected = set()
+		for room in itertools.chain(oldRooms, newRooms):
+			affected.add(regionKey(room))
+			# The neighbors' regions are affected as well, because a room is a portal if it is linked to another region.
+			affected.update(self.roomRegions[exitObj.to] for exitObj in room.exits if exitObj.to in self.roomRegions)
+		for room in oldRooms:
+			key = self.roomRegions.pop(room.id, None)
+			if key is not None:
+				self.members[key].discard(room.id)
+		for room in newRooms:
+			key = self.roomRegions[room.id] = regionKey(room)
+			self.members.setdefault(key, set()).add(room.id)
+		for key in affected:
+			self.regions.pop(key, None)
+
+	def getRegion(self, key):
+		"""Returns the Region with key, working out its portals and internal routes if they aren't known"""
+		region = self.regions.get(key)
+		if region is not None:
+			return region
+		rooms = self.rooms
+		roomRegions = self.roomRegions
+		reverseExits = self.getReverseExits()
+		members = [rooms[roomID] for roomID in self.members.get(key, ())]
+		entrances = [room for room in members if any(roomRegions.get(fromID, key) != key for fromID in reverseExits.get(room.id, ()))]
+		exits = set(room for room in members if any(roomRegions.get(exitObj.to, key) != key for exitObj in room.exits))
+		region = Region(key, entrances, exits)
+		for entrance in entrances:
+			costs, parents = self.searchRegion(entrance, key)
+			region.edges[entrance] = [(costs[room], room) for room in exits if room in costs and room is not entrance]
+			region.parents[entrance] = parents
+		self.regions[key] = region
+		return region
+
+	def searchRegion(self, origin, key, backward=False):
+		"""
+		Searches the rooms of a region from origin, without leaving the region.
+		Returns a dict mapping each room reached to the cost of the rooms entered on the way, and a dict mapping each room to the room it was reached from.
+		If backward is True, the search follows exits in reverse, so the costs are those of the routes from each room to origin, and each room is mapped to the next room on the way to origin.
+		"""
+		rooms = self.rooms
+		roomRegions = self.roomRegions
+		reverseExits = self.getReverseExits()
+		blockedRooms = self.blockedRooms
+		blockedExits = self.blockedExits
+		costOverrides = self.costOverrides
+		costs = {origin: 0.0}
+		parents = {origin: origin}
+		closed = set()
+		opened = [(0.0, origin)]
+		while opened:
+			currentCost, current = heapq.heappop(opened)
+			if current in closed:
+				continue
+			closed.add(current)
+			if backward:
+				if current.id in blockedRooms:
+					# Routes can't enter a blocked room, so it doesn't lead anywhere.
+					continue
+				neighbors = reverseExits.get(current.id, ())
+				# Entering the current room is what costs, whichever room the route came from.
+				enterCost = roomCost(current, costOverrides)
+			else:
+				neighbors = [exitObj.to for exitObj in current.exits if not blockedExits or (current.id, exitObj.dir) not in blockedExits]
+			for neighborID in neighbors:
+				if roomRegions.get(neighborID) != key:
+					continue
+				neighbor = rooms[neighborID]
+				if backward and blockedExits and not hasOpenExit(neighbor, current.id, blockedExits) or not backward and neighborID in blockedRooms:
+					continue
+				neighborCost = currentCost + (enterCost if backward else roomCost(neighbor, costOverrides))
+				if neighbor not in costs or costs[neighbor] > neighborCost:
+					costs[neighbor] = neighborCost
+					parents[neighbor] = current
+					heapq.heappush(opened, (neighborCost, neighbor))
+		return costs, parents
+
+	def findDirections(self, origin, destination):
+		"""Returns a list of the direction names along the cheapest route from origin to destination, or None if there isn't a route"""
+		if origin == destination:
+			return []
+		if self.members is None:
+			self.buildMembers()
+		rooms = self.rooms
+		roomRegions = self.roomRegions
+		originKey = roomRegions[origin.id]
+		destinationKey = roomRegions[destination.id]
+		# The routes inside the start and end regions are searched in full, from the origin, and backward from the destination.
+		startCosts, startParents = self.searchRegion(origin, originKey)
+		endCosts, endNext = self.searchRegion(destination, destinationKey, backward=True)
+		originRegion = self.getRegion(originKey)
+		# The nodes of the abstract graph are portal rooms, plus None for the destination.
+		# Each node is mapped to the node it was reached from, and a description of the edge between them.
+		parents = {}
+		costs = {}
+		counter = itertools.count()
+		opened = []
+
+		def push(cost, node, parent, edge):
+			if node not in costs or costs[node] > cost:
+				costs[node] = cost
+				parents[node] = (parent, edge)
+				heapq.heappush(opened, (cost, next(counter), node))
+
+		if destination in startCosts:
+			push(startCosts[destination], None, origin, ("start", destination))
+		for room in originRegion.exits:
+			if room in startCosts:
+				push(startCosts[room], room, origin, ("start", room))
+		closed = set()
+		while opened:
+			currentCost, ignored, node = heapq.heappop(opened)
+			if node is None:
+				return self.expandRoute(origin, destination, parents, startParents, endNext)
+			if node in closed:
+				continue
+			closed.add(node)
+			key = roomRegions[node.id]
+			region = self.getRegion(key)
+			if key == destinationKey and node in endCosts:
+				push(currentCost + endCosts[node], None, node, ("end", node))
+			for cost, room in region.edges.get(node, ()):
+				push(currentCost + cost, room, node, ("inside", node, room))
+			if node in region.exits:
+				for exitObj in node.exits:
+					if exitObj.to in self.blockedRooms or self.blockedExits and (node.id, exitObj.dir) in self.blockedExits:
+						continue
+					if exitObj.to in roomRegions and roomRegions[exitObj.to] != key:
+						neighbor = rooms[exitObj.to]
+						push(currentCost + roomCost(neighbor, self.costOverrides), neighbor, node, ("between", node, neighbor))
+		return None
+
+	def expandRoute(self, origin, destination, parents, startParents, endNext):
+		"""Returns the list of directions along the route found on the abstract graph, filling in the routes inside each region"""
+		edges = []
+		node = None
+		while node is not origin:
+			node, edge = parents[node]
+			edges.append(edge)
+		edges.reverse()
+		directions = []
+		for edge in edges:
+			if edge[0] == "start":
+				directions.extend(self.traceParents(startParents, origin, edge[1]))
+			elif edge[0] == "inside":
+				entrance, exitRoom = edge[1:]
+				directions.extend(self.traceParents(self.regions[self.roomRegions[entrance.id]].parents[entrance], entrance, exitRoom))
+			elif edge[0] == "between":
+				directions.append(exitDirection(edge[1], edge[2], self.blockedExits))
+			else:
+				# Follow the backward search's links from the portal to the destination.
+				room = edge[1]
+				while room is not destination:
+					nextRoom = endNext[room]
+					directions.append(exitDirection(room, nextRoom, self.blockedExits))
+					room = nextRoom
+		return directions
+
+	def traceParents(self, parents, origin, destination):
+		directions = []
+		room = destination
+		while room is not origin:
+			directions.append(exitDirection(parents[room], room, self.blockedExits))
+			room = parents[room]
+		directions.reverse()
+		return directions
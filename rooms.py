@@ -1,30 +1,235 @@
-﻿TERRAINS = {
-	# Name: (Symbol for prompt, Cost for path Find)
-	"INDOORS": ("[", 1.0),
-	"CITY": ("#", 1.0),
-	"ROAD": ("+", 1.1),
-	"FIELD": (".", 1.2),
-	"CAVERN": ("O", 1.2),
-	"TUNNEL": ("=", 1.2),
-	"SHALLOWWATER": ("%", 1.3),
-	"FOREST": ("f", 1.4),
-	"HILLS": ("(", 2.0),
-	"BRUSH": (":", 2.5),
-	"MOUNTAINS": ("<", 3.0),
-	"UNDEFINED": ("", 5.0),
-	"WATER": ("~", 15.0),
-	"RAPIDS": ("W", 25.0),
-	"UNDERWATER": ("U", 30.0),
-	"RANDOM": ("|", 90.0),
-	"DEATH": ("?", 100.0)}
-
-
-class Room(object):
-	"""A class representing a room in the world"""
-
-	def setCost(self, value):
-		self.terrainSymbol, self.cost = TERRAINS.get(value, ("", 5.0))
-
-
-class Exit(object):
-	pass
+﻿import sys
+
+TERRAINS = {
+	# Name: (Symbol for prompt, Cost for path Find)
+	"INDOORS": ("[", 1.0),
+	"CITY": ("#", 1.0),
+	"ROAD": ("+", 1.1),
+	"FIELD": (".", 1.2),
+	"CAVERN": ("O", 1.2),
+	"TUNNEL": ("=", 1.2),
+	"SHALLOWWATER": ("%", 1.3),
+	"FOREST": ("f", 1.4),
+	"HILLS": ("(", 2.0),
+	"BRUSH": (":", 2.5),
+	"MOUNTAINS": ("<", 3.0),
+	"UNDEFINED": ("", 5.0),
+	"WATER": ("~", 15.0),
+	"RAPIDS": ("W", 25.0),
+	"UNDERWATER": ("U", 30.0),
+	"RANDOM": ("|", 90.0),
+	"DEATH": ("?", 100.0)}
+
+
+class NamedBitFlags(object):
+	def __init__(self, names_and_bits):
+		self.map_by_name = {}
+		self.map_by_number = {}
+		# Maps flag values to the frozen sets returned by decode.
+		self.decode_table = {}
+		for name, bit in names_and_bits:
+			self.map_by_number[1 << (bit - 1)] = name
+			self.map_by_name[name] = 1 << (bit - 1)
+
+	def bits_to_flag_set(self, bits):
+		flag_set = set()
+		for num in self.map_by_number.keys():
+			if bits & num:
+				flag_set.add(self.map_by_number[num])
+		return flag_set
+
+	def decode(self, bits):
+		"""Returns a frozen set of the flag names in bits. Every value is only decoded once"""
+		try:
+			return self.decode_table[bits]
+		except KeyError:
+			flag_set = self.decode_table[bits] = frozenset(self.bits_to_flag_set(bits))
+			return flag_set
+
+
+mobflags = NamedBitFlags([
+	("rent", 1),
+	("shop", 2),
+	("weaponshop", 3),
+	("armourshop", 4),
+	("foodshop", 5),
+	("petshop", 6),
+	("guild", 7),
+	("scoutguild", 8),
+	("mageguild", 9),
+	("clericguild", 10),
+	("warriorguild", 11),
+	("rangerguild", 12),
+	("smob", 13), # Aggressive mob.
+	("quest", 14),
+	("any", 15), # Peaseful mob.
+	("reserved2", 16)
+])
+
+loadflags = NamedBitFlags([
+	("treasure", 1),
+	("armour", 2),
+	("weapon", 3),
+	("water", 4),
+	("food", 5),
+	("herb", 6),
+	("key", 7),
+	("mule", 8),
+	("horse", 9),
+	("packhorse", 10),
+	("trainedhorse", 11),
+	("rohirrim", 12),
+	("warg", 13),
+	("boat", 14),
+	("attention", 15),
+	("tower", 16), # Player can 'watch' surrounding rooms from this one.
+	("clock", 17),
+	("mail", 18),
+	("stable", 19)
+])
+
+exitflags = NamedBitFlags([
+	("exit", 1),
+	("door", 2),
+	("road", 3),
+	("climb", 4),
+	("random", 5),
+	("special", 6),
+	("no_match", 7),
+	("flow", 8),
+	("no_flee", 9),
+	("damage", 10),
+	("fall", 11),
+	("guarded", 12)
+])
+
+doorflags = NamedBitFlags([
+	("hidden", 1),
+	("needkey", 2),
+	("noblock", 3),
+	("nobreak", 4),
+	("nopick", 5),
+	("delayed", 6),
+	("callable", 7),
+	("knockable", 8),
+	("magic", 9),
+	("action", 10)
+])
+
+
+class Room(object):
+	"""A class representing a room in the world"""
+	# Flags are stored as integers. The mobFlags and loadFlags properties decode them into sets of flag names.
+	mobFlagBits = 0
+	loadFlagBits = 0
+
+	@property
+	def mobFlags(self):
+		return mobflags.decode(self.mobFlagBits)
+
+	@property
+	def loadFlags(self):
+		return loadflags.decode(self.loadFlagBits)
+
+	def setCost(self, value):
+		self.terrainSymbol, self.cost = TERRAINS.get(value, ("", 5.0))
+
+	def directionPrefixes(self):
+		"""Returns a dict mapping every abbreviation of the exit directions to the first exit that it matches"""
+		# The dict is built the first time that it's needed, and reused after that.
+		try:
+			return self._directionPrefixes
+		except AttributeError:
+			pass
+		prefixes = {}
+		for exitObj in getattr(self, "exits", []):
+			direction = getattr(exitObj, "dir", "UNDEFINED")
+			for length in xrange(1, len(direction) + 1):
+				prefixes.setdefault(direction[:length], exitObj)
+		self._directionPrefixes = prefixes
+		return prefixes
+
+
+class Exit(object):
+	"""A class representing an exit from a room"""
+	# Flags are stored as integers. The exitFlags and doorFlags properties decode them into sets of flag names.
+	exitFlagBits = 0
+	doorFlagBits = 0
+
+	@property
+	def exitFlags(self):
+		return exitflags.decode(self.exitFlagBits)
+
+	@property
+	def doorFlags(self):
+		return doorflags.decode(self.doorFlagBits)
+
+
+class TextPool(object):
+	"""
+	Stores a single copy of each distinct string read by a database loader, so that rooms with the same text share the same string object.
+	Strings can be looked up either by their value, or by the raw bytes they were decoded from, which avoids decoding repeated text at all.
+	"""
+
+	def __init__(self):
+		self.strings = {}
+		# The number of strings looked up, and the memory saved by returning an existing string rather than a new one.
+		self.lookups = 0
+		self.savedBytes = 0
+
+	def decode(self, data, encoding):
+		"""Returns the string decoded from data, decoding it only the first time that data is seen"""
+		if not data:
+			return data.decode(encoding)
+		self.lookups += 1
+		try:
+			text = self.strings[data]
+		except KeyError:
+			text = self.strings[data] = data.decode(encoding)
+			return text
+		self.savedBytes += sys.getsizeof(text)
+		return text
+
+	def intern(self, text):
+		"""Returns the stored string equal to text, storing text if there isn't one"""
+		# Empty strings are already shared by Python.
+		if not text:
+			return text
+		self.lookups += 1
+		stored = self.strings.setdefault(text, text)
+		if stored is not text:
+			self.savedBytes += sys.getsizeof(text)
+		return stored
+
+	def close(self):
+		"""Frees the lookup table once loading has finished, keeping the statistics. The strings themselves are still referenced by the rooms"""
+		self.distinct = len(self.strings)
+		self.strings = {}
+
+
+def roomFields(room):
+	"""Returns the attributes of a room and its exits in a form that can be compared with the same room from another load of the database"""
+	# Attributes starting with an underscore are derived from the others, and aren't compared.
+	fields = sorted((key, value) for key, value in vars(room).iteritems() if key != "exits" and not key.startswith("_"))
+	exits = [sorted(vars(exitObj).iteritems()) for exitObj in getattr(room, "exits", [])]
+	return fields, exits
+
+
+def buildReverseExits(rooms):
+	"""Returns a dict mapping the ID of every room to a tuple of the IDs of the rooms with exits leading into it, found by inverting the exits"""
+	reverse = {}
+	for fromID, room in rooms.iteritems():
+		# A room with several exits into the same room is only listed once.
+		for toID in set(exitObj.to for exitObj in room.exits if exitObj.to in rooms):
+			reverse.setdefault(toID, []).append(fromID)
+	return dict((roomID, tuple(fromIDs)) for roomID, fromIDs in reverse.iteritems())
+
+
+def hasOpenExit(room, targetID, blockedExits):
+	"""Returns True if room has an exit leading to targetID that isn't blocked. blockedExits is a set of (room ID, direction) tuples"""
+	return any(exitObj.to == targetID and (room.id, exitObj.dir) not in blockedExits for exitObj in room.exits)
+
+
+def roomCost(room, costOverrides):
+	"""Returns the cost of entering room. costOverrides is a dict mapping the IDs of rooms whose cost has been changed to their new costs"""
+	return costOverrides.get(room.id, room.cost) if costOverrides else room.cost
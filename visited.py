@@ -0,0 +1,75 @@
+﻿import binascii
+import os
+
+
+BITMAP_MAGIC = "MEVB"
+
+
+class RoomBitmap(object):
+	"""A set of numeric room IDs, stored as 1 bit for every possible ID up to the highest one in the set"""
+
+	def __init__(self, data=""):
+		self.bits = bytearray(data)
+
+	@classmethod
+	def fromIDs(cls, roomIDs):
+		bitmap = cls()
+		bitmap.update(roomIDs)
+		return bitmap
+
+	def add(self, roomID):
+		if not roomID.isdigit():
+			return
+		index = int(roomID)
+		byteIndex = index >> 3
+		if byteIndex >= len(self.bits):
+			self.bits.extend(bytearray(byteIndex + 1 - len(self.bits)))
+		self.bits[byteIndex] |= 1 << (index & 7)
+
+	def update(self, roomIDs):
+		indexes = [int(roomID) for roomID in roomIDs if roomID.isdigit()]
+		if not indexes:
+			return
+		# Grow the bitmap once, rather than once for every new highest ID.
+		size = (max(indexes) >> 3) + 1
+		if size > len(self.bits):
+			self.bits.extend(bytearray(size - len(self.bits)))
+		bits = self.bits
+		for index in indexes:
+			bits[index >> 3] |= 1 << (index & 7)
+
+	def __contains__(self, roomID):
+		if not roomID.isdigit():
+			return False
+		index = int(roomID)
+		byteIndex = index >> 3
+		return byteIndex < len(self.bits) and bool(self.bits[byteIndex] & 1 << (index & 7))
+
+	def toLong(self):
+		"""Returns the bitmap as an integer, with bit n set if room ID n is in the set"""
+		if not self.bits:
+			return 0
+		# The bytes are stored lowest first, so they're reversed to read them as a big-endian number.
+		return long(binascii.hexlify(str(self.bits[::-1])), 16)
+
+	def __len__(self):
+		return bin(self.toLong()).count("1")
+
+	def countIn(self, other):
+		"""Returns the number of room IDs that are in both this bitmap and other"""
+		return bin(self.toLong() & other.toLong()).count("1")
+
+	def load(self, fileName):
+		"""Replaces the contents of the bitmap with the contents of fileName, if it exists"""
+		if not os.path.exists(fileName):
+			return
+		with open(fileName, "rb") as fileObj:
+			data = fileObj.read()
+		if not data.startswith(BITMAP_MAGIC):
+			raise ValueError("%s is not a visited rooms file." % fileName)
+		self.bits = bytearray(data[len(BITMAP_MAGIC):])
+
+	def save(self, fileName):
+		with open(fileName, "wb") as fileObj:
+			fileObj.write(BITMAP_MAGIC)
+			fileObj.write(self.bits)